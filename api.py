@@ -0,0 +1,321 @@
+"""API HTTP local para que las cajas (POS) facturen contra la misma base.
+
+    python api.py                                   # 127.0.0.1:8080
+    python api.py --puerto 8080 --workers 8 --cola 64
+    python api.py --agrupar-ms 5 --agrupar-max 50   # facturas de varias cajas en un mismo commit
+
+    POST /facturas   {"id_cliente": 1, "lineas": [{"id_producto": 3, "cantidad": 2}]}
+                     (o "cliente": nombre, "producto": nombre; el precio es el del catálogo)
+    POST /clientes   {"nombre", "documento", "direccion", "telefono", "correo"}
+    POST /productos  {"nombre", "descripcion", "precio", "stock"}
+    GET  /facturas?cliente=&limite=50
+    GET  /productos?q=pre    GET /clientes?q=pre     (sugerencias por prefijo, desde el catálogo)
+    GET  /metricas           GET /salud
+
+El servidor HTTP es asyncio puro (HTTP/1.1 con keep-alive, solo JSON); todo
+lo que toca la base corre en un pool de --workers hilos, del mismo tamaño que
+el pool de conexiones. Si hay más de --workers + --cola pedidos en curso, los
+nuevos se rechazan enseguida con 503 y Retry-After en lugar de encolarse sin
+límite. Las respuestas son 201 (guardado), 202 (guardado sin conexión, se
+sincroniza después) o 422 (rechazado, con el motivo). Con --agrupar-ms las
+facturas pasan por el escritor agrupado (escritor.py); sus lotes y esperas
+se ven en /metricas.
+"""
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from mysql.connector import Error
+
+import escritor
+from db import configure_pool, tx_stats
+from catalogo import get_catalogo
+from datos import fetch_invoices, insert_client, insert_invoice, insert_product
+from metricas import Histograma, get_metricas
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.facturas.factura import Factura
+from app.facturas.totales import redondear
+
+WORKERS = 8
+COLA_MAX = 64
+MAX_CUERPO = 1 << 20
+MAX_ENCABEZADOS = 64 * 1024
+TIMEOUT_INACTIVO = 30    # segundos que se mantiene abierta una conexión sin pedidos
+
+ESTADOS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Entity",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class Rechazo(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# --- operaciones (corren en el pool de hilos) ---
+
+def _entero(valor, campo):
+    """valor si es un entero JSON; 2.9 o "2" no se redondean ni se convierten."""
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise Rechazo(400, f"{campo} debe ser un número entero")
+    return valor
+
+
+def crear_factura(cuerpo):
+    catalogo = get_catalogo()
+    id_cliente = cuerpo.get("id_cliente")
+    if id_cliente is None and cuerpo.get("cliente"):
+        id_cliente = catalogo.cliente_id(cuerpo["cliente"])
+    if id_cliente is None:
+        raise Rechazo(422, "Cliente no encontrado")
+    factura = Factura(Cliente(cuerpo.get("cliente"), None, id_cliente=int(id_cliente)))
+    lineas = cuerpo.get("lineas") or []
+    if not isinstance(lineas, list) or not all(isinstance(l, dict) for l in lineas):
+        raise Rechazo(400, "lineas debe ser una lista de objetos")
+    for linea in lineas:
+        # la caja no fija precios: un descuento o un cambio de precio pasa por el catálogo
+        if "precio" in linea:
+            raise Rechazo(400, "El precio no se envía: se usa el del catálogo")
+        cantidad = _entero(linea.get("cantidad", 1), "cantidad")
+        if cantidad <= 0:
+            raise Rechazo(422, "Cantidad inválida")
+        if "id_producto" in linea:
+            id_producto = _entero(linea["id_producto"], "id_producto")
+            row = catalogo.producto_por_id(id_producto)
+            precio = row[2] if row else None
+        else:
+            id_producto, precio = catalogo.producto(linea.get("producto"))
+        if id_producto is None or precio is None:
+            raise Rechazo(422, f"Producto no encontrado: {linea}")
+        factura.agregar_producto(Producto(linea.get("producto"), precio, id_producto=id_producto), cantidad)
+    ok, err = insert_invoice(factura)
+    if not ok:
+        raise Rechazo(422, err)
+    if factura.id_factura is None:
+        return 202, {"estado": "en_cola", "mensaje": err, "total": factura.total()}
+    return 201, {"id_factura": factura.id_factura, "total": factura.total()}
+
+
+def _guardar(fn, cuerpo, campos, obligatorios):
+    faltan = [c for c in obligatorios if cuerpo.get(c) in (None, "")]
+    if faltan:
+        raise Rechazo(400, "Faltan campos: " + ", ".join(faltan))
+    ok, err = fn(*(cuerpo.get(c) for c in campos))
+    if not ok:
+        raise Rechazo(422, err)
+    return (202, {"estado": "en_cola", "mensaje": err}) if err else (201, {"estado": "guardado"})
+
+
+def crear_cliente(cuerpo):
+    return _guardar(insert_client, cuerpo, ("nombre", "documento", "direccion", "telefono", "correo"),
+                    ("nombre", "documento"))
+
+
+def crear_producto(cuerpo):
+    cuerpo = dict(cuerpo, stock=int(cuerpo.get("stock") or 0))
+    if cuerpo["stock"] < 0:
+        raise Rechazo(422, "Stock inválido")
+    if cuerpo.get("precio") is not None:
+        cuerpo["precio"] = redondear(cuerpo["precio"])
+        if cuerpo["precio"] < 0:
+            raise Rechazo(422, "Precio inválido")
+    return _guardar(insert_product, cuerpo, ("nombre", "descripcion", "precio", "stock"),
+                    ("nombre", "precio"))
+
+
+def _limite(params, defecto, maximo):
+    """?limite= acotado a [1, maximo]: 0 o negativo no pueden quitar el LIMIT."""
+    return max(1, min(int(params.get("limite", defecto)), maximo))
+
+
+def listar_facturas(params):
+    limite = _limite(params, 50, 500)
+    # el nombre se resuelve en el índice del catálogo, como en la interfaz: sin LIKE '%...%' en la base
+    cliente = params.get("cliente")
+    id_clientes = get_catalogo().buscar_clientes(cliente) if cliente else None
+    rows = fetch_invoices(id_clientes=id_clientes, limit=limite)
+    return 200, [{"id_factura": r[0], "cliente": r[1], "fecha": r[2], "total": r[3]} for r in rows]
+
+
+def sugerir(tabla, params):
+    return 200, get_catalogo().sugerir(tabla, params.get("q", ""), _limite(params, 20, 200))
+
+
+class Servidor:
+    def __init__(self, workers=WORKERS, cola=COLA_MAX):
+        self.workers = workers
+        self.capacidad = workers + cola
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self.en_curso = 0
+        self.rechazados = 0
+        self.latencias = {}      # "METODO /ruta" -> Histograma
+        self.estados = {}
+        self.desde = time.time()
+        self.rutas = {
+            ("POST", "/facturas"): (crear_factura, True),
+            ("POST", "/clientes"): (crear_cliente, True),
+            ("POST", "/productos"): (crear_producto, True),
+            ("GET", "/facturas"): (listar_facturas, False),
+            ("GET", "/productos"): (lambda p: sugerir("productos", p), False),
+            ("GET", "/clientes"): (lambda p: sugerir("clientes", p), False),
+        }
+
+    def metricas(self):
+        return {
+            "desde": self.desde,
+            "en_curso": self.en_curso,
+            "capacidad": self.capacidad,
+            "rechazados_503": self.rechazados,
+            "estados": self.estados,
+            "rutas": {ruta: h.resumen() for ruta, h in self.latencias.items()},
+            "transacciones": dict(tx_stats),
+            "escritor": escritor.get_escritor().stats() if escritor.get_escritor() else None,
+            "consultas": get_metricas().snapshot()["consultas"][:20],
+        }
+
+    async def despachar(self, metodo, ruta, params, cuerpo):
+        if ruta == "/salud":
+            return 200, {"ok": True, "en_curso": self.en_curso}
+        if ruta == "/metricas":
+            return 200, self.metricas()
+        destino = self.rutas.get((metodo, ruta))
+        if destino is None:
+            if any(r == ruta for _, r in self.rutas):
+                return 405, {"error": "Método no permitido"}
+            return 404, {"error": "No existe"}
+        if self.en_curso >= self.capacidad:
+            self.rechazados += 1
+            return 503, {"error": "Servidor ocupado, reintentar"}
+        fn, con_cuerpo = destino
+        self.en_curso += 1
+        try:
+            arg = json.loads(cuerpo or b"{}") if con_cuerpo else params
+            if con_cuerpo and not isinstance(arg, dict):
+                return 400, {"error": "Se espera un objeto JSON"}
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, arg)
+        except (ValueError, TypeError, ArithmeticError) as e:
+            return 400, {"error": f"JSON o parámetro inválido: {e}"}
+        except Rechazo as e:
+            return e.estado, {"error": str(e)}
+        except Error as e:
+            return 500, {"error": str(e)}
+        finally:
+            self.en_curso -= 1
+
+    async def atender(self, reader, writer):
+        try:
+            while True:
+                try:
+                    encabezado = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), TIMEOUT_INACTIVO)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self.responder(writer, 413, {"error": "Encabezados demasiado grandes"}, False)
+                    return
+                t = time.perf_counter()
+                lineas = encabezado.decode("latin-1").split("\r\n")
+                try:
+                    metodo, destino, version = lineas[0].split(" ", 2)
+                except ValueError:
+                    await self.responder(writer, 400, {"error": "Pedido inválido"}, False)
+                    return
+                headers = {}
+                for linea in lineas[1:]:
+                    if ":" in linea:
+                        k, v = linea.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                try:
+                    largo = int(headers.get("content-length") or 0)
+                except ValueError:
+                    largo = -1
+                if largo < 0:
+                    await self.responder(writer, 400, {"error": "Content-Length inválido"}, False)
+                    return
+                if largo > MAX_CUERPO:
+                    await self.responder(writer, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    return
+                cuerpo = await reader.readexactly(largo) if largo else b""
+                seguir = (headers.get("connection", "").lower() != "close"
+                          and version.upper() == "HTTP/1.1")
+
+                partes = urlsplit(destino)
+                params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+                ruta = partes.path.rstrip("/") or "/"
+                estado, datos = await self.despachar(metodo.upper(), ruta, params, cuerpo)
+                await self.responder(writer, estado, datos, seguir)
+
+                clave = f"{metodo.upper()} {ruta}"
+                h = self.latencias.get(clave)
+                if h is None:
+                    h = self.latencias[clave] = Histograma()
+                h.agregar((time.perf_counter() - t) * 1000)
+                self.estados[estado] = self.estados.get(estado, 0) + 1
+                if not seguir:
+                    return
+        finally:
+            writer.close()
+
+    async def responder(self, writer, estado, datos, seguir):
+        cuerpo = json.dumps(datos, default=str, ensure_ascii=False).encode("utf-8")
+        cabeceras = [f"HTTP/1.1 {estado} {ESTADOS.get(estado, '')}",
+                     "Content-Type: application/json; charset=utf-8",
+                     f"Content-Length: {len(cuerpo)}",
+                     "Connection: " + ("keep-alive" if seguir else "close")]
+        if estado == 503:
+            cabeceras.append("Retry-After: 1")
+        writer.write(("\r\n".join(cabeceras) + "\r\n\r\n").encode("latin-1") + cuerpo)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def servir(self, host, puerto, listo=None):
+        # el catálogo se carga antes de aceptar pedidos: las sugerencias no consultan la base
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, get_catalogo().refresh)
+        server = await asyncio.start_server(self.atender, host, puerto, limit=MAX_ENCABEZADOS,
+                                            backlog=self.capacidad * 2)
+        if listo is not None:
+            listo(server)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="API HTTP local de facturación")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="hilos y conexiones a la base")
+    parser.add_argument("--cola", type=int, default=COLA_MAX,
+                        help="pedidos que pueden esperar un worker antes de responder 503")
+    parser.add_argument("--agrupar-ms", type=float, default=0,
+                        help="junta las facturas que llegan en esa ventana en un solo commit (0 = no)")
+    parser.add_argument("--agrupar-max", type=int, default=escritor.AGRUPAR_MAX,
+                        help="facturas por commit como máximo")
+    args = parser.parse_args(argv)
+
+    configure_pool(size=args.workers)
+    if args.agrupar_ms > 0:
+        escritor.activar(args.agrupar_ms, args.agrupar_max)
+    servidor = Servidor(args.workers, args.cola)
+    listo = lambda s: print("Escuchando en", ", ".join(
+        "%s:%s" % sock.getsockname()[:2] for sock in s.sockets), file=sys.stderr)
+    try:
+        asyncio.run(servidor.servir(args.host, args.puerto, listo))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.executor.shutdown(wait=False, cancel_futures=True)
+        escritor.detener()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
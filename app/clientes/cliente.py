@@ -1,4 +1,7 @@
 class Cliente:
-    def __init__(self, nombre, identificacion):
+    __slots__ = ("nombre", "identificacion", "id_cliente")
+
+    def __init__(self, nombre, identificacion, id_cliente=None):
         self.nombre = nombre
         self.identificacion = identificacion
+        self.id_cliente = id_cliente
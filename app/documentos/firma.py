@@ -0,0 +1,82 @@
+import hashlib
+import hmac
+import os
+import secrets
+
+from app.facturas.totales import redondear
+
+RUTA_CLAVE = os.environ.get(
+    "EASYFACT_CLAVE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "claves", "firma.key"),
+)
+
+_clave = None
+
+
+def canonicalizar(doc: dict) -> bytes:
+    """Forma canónica de la factura: campos fijos separados por '|', importes con 2 decimales.
+
+    Solo depende de los datos (no del orden de las claves o de las líneas, ni
+    del formato con que la base devuelva los números), así que el mismo doc da
+    siempre el mismo hash, aunque repita un producto en varias líneas.
+    """
+    cliente = doc["cliente"]
+    campos = [str(doc["id_factura"]), str(doc["fecha"]), f"{redondear(doc['total']):.2f}",
+              str(cliente["id_cliente"]), (cliente.get("documento") or "").strip()]
+    lineas = sorted(doc["lineas"], key=lambda l: (l["id_producto"], int(l["cantidad"]), redondear(l["precio"])))
+    for l in lineas:
+        campos.append(f"{l['id_producto']}:{l['cantidad']}:{redondear(l['precio']):.2f}")
+    return "|".join(campos).encode("utf-8")
+
+
+def cufe(doc: dict) -> str:
+    return hashlib.sha384(canonicalizar(doc)).hexdigest()
+
+
+def generar_clave(ruta: str = RUTA_CLAVE):
+    """Crea una clave HMAC aleatoria en ruta (solo lectura para el usuario)."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    fd = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(secrets.token_hex(32) + "\n")
+
+
+def hay_clave(ruta: str = RUTA_CLAVE) -> bool:
+    """Si la firma está configurada (python firmar.py --generar-clave); sin clave no se firma."""
+    return _clave is not None or os.path.exists(ruta)
+
+
+def cargar_clave(ruta: str = RUTA_CLAVE):
+    """Clave HMAC (archivo de texto) o clave privada Ed25519 en PEM (requiere cryptography)."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    if datos.startswith(b"-----BEGIN"):
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+        return load_pem_private_key(datos, password=None)
+    return datos.strip()
+
+
+def firmar(hash_hex: str, clave) -> str:
+    if isinstance(clave, bytes):
+        return "hmac-sha256:" + hmac.new(clave, hash_hex.encode(), hashlib.sha256).hexdigest()
+    return "ed25519:" + clave.sign(hash_hex.encode()).hex()
+
+
+def iniciar(ruta: str = None):
+    """Carga la clave en este proceso; es el initializer de cada worker del pool."""
+    global _clave
+    _clave = cargar_clave(ruta or RUTA_CLAVE)
+
+
+def sellar(doc: dict):
+    """(cufe, firma) del documento, con la clave del proceso."""
+    if _clave is None:
+        iniciar()
+    h = cufe(doc)
+    return h, firmar(h, _clave)
+
+
+def sellar_bloque(docs):
+    """Filas (cufe, firma, id_factura) listas para el UPDATE."""
+    return [sellar(doc) + (doc["id_factura"],) for doc in docs]
@@ -0,0 +1,128 @@
+import os
+from functools import lru_cache
+from string import Template
+
+PLANTILLAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plantillas")
+EMISOR = "EasyFact One"
+
+PDF_ANCHO, PDF_ALTO = 595, 842      # A4 en puntos
+PDF_MARGEN = 50
+PDF_INTERLINEA = 14
+PDF_LINEAS_POR_PAGINA = (PDF_ALTO - 2 * PDF_MARGEN) // PDF_INTERLINEA
+
+
+def escape(texto: str) -> str:
+    # igual a xml.sax.saxutils.escape, que arrastra urllib/http.client al importarse
+    return texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+@lru_cache(maxsize=None)
+def plantilla(nombre: str) -> Template:
+    """Lee y compila la plantilla una sola vez por proceso."""
+    with open(os.path.join(PLANTILLAS_DIR, nombre), encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def render_xml(doc: dict) -> bytes:
+    linea = plantilla("linea.xml")
+    lineas = "".join(
+        linea.substitute({k: escape(str(v)) for k, v in dict(l, numero=i).items()})
+        for i, l in enumerate(doc["lineas"], 1)
+    )
+    cliente = doc["cliente"]
+    return plantilla("factura.xml").substitute(
+        id_factura=doc["id_factura"],
+        fecha=escape(str(doc["fecha"])),
+        emisor=escape(EMISOR),
+        id_cliente=cliente["id_cliente"],
+        cliente=escape(cliente["nombre"] or ""),
+        documento=escape(cliente.get("documento") or ""),
+        lineas=lineas,
+        total=doc["total"],
+    ).encode("utf-8")
+
+
+def _texto_pdf(texto: str) -> bytes:
+    crudo = texto.encode("cp1252", errors="replace")
+    return crudo.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _lineas_pdf(doc: dict):
+    cliente = doc["cliente"]
+    yield f"{EMISOR} - Factura No. {doc['id_factura']}"
+    yield f"Fecha: {doc['fecha']}"
+    yield f"Cliente: {cliente['nombre']}  Doc: {cliente.get('documento') or '-'}"
+    yield ""
+    yield f"{'Producto':<40}{'Cant.':>8}{'Precio':>14}{'Subtotal':>16}"
+    for l in doc["lineas"]:
+        yield f"{str(l['producto'])[:39]:<40}{l['cantidad']:>8}{l['precio']:>14}{l['subtotal']:>16}"
+    yield ""
+    yield f"{'TOTAL':<62}{doc['total']:>16}"
+
+
+def render_pdf(doc: dict) -> bytes:
+    """PDF mínimo (Courier, WinAnsi) con una línea de texto por renglón y paginado."""
+    renglones = list(_lineas_pdf(doc))
+    paginas = [renglones[i:i + PDF_LINEAS_POR_PAGINA]
+               for i in range(0, len(renglones), PDF_LINEAS_POR_PAGINA)] or [[]]
+
+    # objetos 1: catálogo, 2: páginas, 3: fuente, luego (página, contenido) por página
+    objetos = [None, None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for pagina in paginas:
+        stream = [b"BT /F1 9 Tf %d TL %d %d Td" % (PDF_INTERLINEA, PDF_MARGEN, PDF_ALTO - PDF_MARGEN)]
+        stream += [b"(" + _texto_pdf(r) + b") '" for r in pagina]
+        stream.append(b"ET")
+        contenido = b"\n".join(stream)
+        n_pagina = len(objetos) + 1
+        kids.append(b"%d 0 R" % n_pagina)
+        objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                       % (PDF_ANCHO, PDF_ALTO, n_pagina + 1))
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(contenido) + contenido + b"\nendstream")
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids)
+
+    salida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objetos, 1):
+        offsets.append(len(salida))
+        salida += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(salida)
+
+
+def escribir_atomico(ruta: str, datos: bytes):
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+    os.replace(tmp, ruta)
+
+
+def renderizar_a_disco(doc: dict, carpeta: str):
+    """Escribe factura_<id>.xml y factura_<id>.pdf en carpeta; devuelve las dos rutas."""
+    base = os.path.join(carpeta, f"factura_{doc['id_factura']}")
+    escribir_atomico(base + ".xml", render_xml(doc))
+    escribir_atomico(base + ".pdf", render_pdf(doc))
+    return base + ".xml", base + ".pdf"
+
+
+def renderizar_bloque(docs, carpeta: str) -> int:
+    for doc in docs:
+        renderizar_a_disco(doc, carpeta)
+    return len(docs)
+
+
+def renderizar_lote(docs, carpeta: str, procesos=None, bloque=50) -> int:
+    """Renderiza docs ya cargados en un pool de procesos; procesos=1 lo hace en este proceso."""
+    os.makedirs(carpeta, exist_ok=True)
+    if procesos == 1:
+        return renderizar_bloque(docs, carpeta)
+    from concurrent.futures import ProcessPoolExecutor
+    partes = [docs[i:i + bloque] for i in range(0, len(docs), bloque)]
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return sum(pool.map(renderizar_bloque, partes, [carpeta] * len(partes)))
@@ -1,13 +1,91 @@
+from array import array
+from operator import index, mul
+
 from app.clientes.cliente import Cliente
 from app.productos.producto import Producto
+from app.facturas.totales import MAX_Q, MIN_Q, LineasColumnares, a_centavos, de_centavos
+
+SIN_ID = 0   # los AUTO_INCREMENT empiezan en 1
+
+
+class Detalles:
+    """Líneas de la factura en columnas: id_producto, precio en centavos y cantidad.
+
+    Se recorre como la lista de (Producto, cantidad) de antes, pero cada
+    Producto se arma al vuelo y no queda guardado. Los precios se guardan
+    redondeados al centavo, como quedan en la base. filas() recorre las
+    columnas sin crear objetos.
+    """
+
+    __slots__ = ("ids", "centavos", "cantidades", "nombres")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.centavos = array("q")
+        self.cantidades = array("q")
+        self.nombres = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        id_producto = self.ids[i]
+        producto = Producto(self.nombres[i], de_centavos(self.centavos[i]),
+                            id_producto=None if id_producto == SIN_ID else id_producto)
+        return producto, self.cantidades[i]
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def __delitem__(self, i):
+        del self.ids[i]
+        del self.centavos[i]
+        del self.cantidades[i]
+        del self.nombres[i]
+
+    def append(self, linea):
+        # se valida y convierte todo antes de agregar: si algo falla, las columnas siguen alineadas
+        producto, cantidad = linea
+        cantidad = index(cantidad)      # TypeError con float o str
+        if cantidad <= 0:
+            raise ValueError(f"Cantidad inválida: {cantidad}")
+        id_producto = SIN_ID if producto.id_producto is None else index(producto.id_producto)
+        if producto.precio is None:
+            raise ValueError(f"Producto {producto.nombre or id_producto} sin precio")
+        centavos = a_centavos(producto.precio)
+        for valor in (id_producto, centavos, cantidad):
+            if not MIN_Q <= valor <= MAX_Q:
+                raise OverflowError(f"Valor fuera de rango: {valor}")
+        self.ids.append(id_producto)
+        self.centavos.append(centavos)
+        self.cantidades.append(cantidad)
+        self.nombres.append(producto.nombre)
+
+    def filas(self):
+        """(id_producto, centavos, cantidad) por línea."""
+        return zip(self.ids, self.centavos, self.cantidades)
+
 
 class Factura:
+    __slots__ = ("cliente", "detalles", "id_factura")
+
     def __init__(self, cliente: Cliente):
         self.cliente = cliente
-        self.detalles = []
+        self.detalles = Detalles()
+        self.id_factura = None
 
     def agregar_producto(self, producto: Producto, cantidad: int):
         self.detalles.append((producto, cantidad))
 
+    def quitar_producto(self, indice: int):
+        del self.detalles[indice]
+
     def total(self):
-        return sum(prod.precio * cant for prod, cant in self.detalles)
+        return de_centavos(sum(map(mul, self.detalles.centavos, self.detalles.cantidades)))
+
+    def columnas(self):
+        lineas = LineasColumnares()
+        lineas.precios.extend(self.detalles.centavos)
+        lineas.cantidades.extend(self.detalles.cantidades)
+        return lineas
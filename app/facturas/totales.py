@@ -0,0 +1,80 @@
+from array import array
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+from operator import mul
+
+CENTAVO = Decimal("0.01")
+REDONDEO = ROUND_HALF_UP
+MIN_Q, MAX_Q = -2**63, 2**63 - 1     # rango de array("q")
+
+
+def a_decimal(valor) -> Decimal:
+    """Convierte precio/monto a Decimal; los float pasan por str para no arrastrar su error binario."""
+    if isinstance(valor, Decimal):
+        return valor
+    if isinstance(valor, float):
+        return Decimal(repr(valor))
+    return Decimal(valor)
+
+
+def redondear(valor) -> Decimal:
+    return a_decimal(valor).quantize(CENTAVO, rounding=REDONDEO)
+
+
+def a_centavos(valor) -> int:
+    return int(redondear(valor) * 100)
+
+
+def de_centavos(centavos: int) -> Decimal:
+    return Decimal(centavos) * CENTAVO     # exacto, exponente -2; más rápido que scaleb
+
+
+def total_lineas(lineas) -> Decimal:
+    """Total exacto de [(precio, cantidad), ...]: cada precio se redondea al centavo antes de multiplicar."""
+    return de_centavos(sum(a_centavos(precio) * cant for precio, cant in lineas))
+
+
+class LineasColumnares:
+    """Líneas de factura guardadas en arreglos de enteros (centavos y cantidades).
+
+    Para facturas con miles de líneas: el total se calcula con map/sum sobre
+    los arreglos, sin crear un Decimal por línea.
+    """
+
+    def __init__(self, lineas=()):
+        self.precios = array("q")       # centavos
+        self.cantidades = array("q")
+        for precio, cant in lineas:
+            self.agregar(precio, cant)
+
+    def __len__(self):
+        return len(self.precios)
+
+    def agregar(self, precio, cantidad: int):
+        self.precios.append(a_centavos(precio))
+        self.cantidades.append(cantidad)
+
+    def total_centavos(self) -> int:
+        return sum(map(mul, self.precios, self.cantidades))
+
+    def total(self) -> Decimal:
+        return de_centavos(self.total_centavos())
+
+
+def totales_por_factura(ids_factura, precios_centavos, cantidades) -> dict:
+    """Recalcula el total de muchas facturas a partir de arreglos paralelos de líneas.
+
+    ids_factura, precios_centavos y cantidades tienen una posición por línea y
+    deben venir ordenados por id_factura (como los devuelve un ORDER BY). Los
+    subtotales se calculan de una pasada y cada factura suma su tramo contiguo.
+    Devuelve {id_factura: Decimal}.
+    """
+    subtotales = array("q", map(mul, precios_centavos, cantidades))
+    totales = {}
+    n, inicio = len(ids_factura), 0
+    while inicio < n:
+        id_factura = ids_factura[inicio]
+        fin = bisect_right(ids_factura, id_factura, inicio)
+        totales[id_factura] = de_centavos(sum(subtotales[inicio:fin]))
+        inicio = fin
+    return totales
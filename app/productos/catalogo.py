@@ -0,0 +1,111 @@
+from array import array
+from bisect import bisect_left
+from operator import index
+
+from app.facturas.totales import MAX_Q, MIN_Q, a_centavos, de_centavos
+
+
+class CatalogoProductos:
+    """Productos en arreglos contiguos, ordenados por id_producto.
+
+    ids, precios (en centavos) y stock van en array('q') y los nombres en una
+    lista: por producto quedan tres enteros de 8 bytes y una referencia, en
+    lugar de una tupla, un Decimal y una entrada de dict. Se usa como el dict
+    id_producto -> (id_producto, nombre, precio, stock) que reemplaza; la tupla
+    se arma al pedirla. Las filas llegan en orden de id (carga completa y las
+    incrementales traen ids mayores al último), así que agregar es un append y
+    buscar por id una bisección.
+    """
+
+    __slots__ = ("ids", "precios", "stock", "nombres")
+
+    def __init__(self, filas=()):
+        self.clear()
+        for fila in filas:
+            self[fila[0]] = fila
+
+    def clear(self):
+        self.ids = array("q")      # primero: sin ids no se busca en las demás columnas
+        self.precios = array("q")
+        self.stock = array("q")
+        self.nombres = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _posicion(self, id_producto):
+        ids = self.ids
+        # los ids salen de AUTO_INCREMENT y casi no tienen huecos: primero se prueba
+        # la posición que tendrían sin huecos, y solo si no está se biseca
+        i = id_producto - ids[0] if ids else -1
+        if 0 <= i < len(ids) and ids[i] == id_producto:
+            return i
+        i = bisect_left(ids, id_producto)
+        return i if i < len(ids) and ids[i] == id_producto else -1
+
+    def fila(self, i):
+        return self.ids[i], self.nombres[i], de_centavos(self.precios[i]), self.stock[i]
+
+    def __contains__(self, id_producto):
+        return self._posicion(id_producto) >= 0
+
+    def __getitem__(self, id_producto):
+        i = self._posicion(id_producto)
+        if i < 0:
+            raise KeyError(id_producto)
+        return self.fila(i)
+
+    def get(self, id_producto, default=None):
+        """Como dict.get; se puede llamar sin lock mientras otro hilo recarga (devuelve default)."""
+        if id_producto is None:
+            return default
+        try:
+            i = self._posicion(id_producto)
+            if i < 0:
+                return default
+            return id_producto, self.nombres[i], de_centavos(self.precios[i]), self.stock[i]
+        except IndexError:
+            return default
+
+    def __setitem__(self, id_producto, fila):
+        # todo se convierte antes de tocar los arreglos: si algo falla, las columnas siguen alineadas
+        _, nombre, precio, stock = fila
+        id_producto = index(id_producto)
+        if precio is None:
+            raise ValueError(f"Producto {id_producto} sin precio")
+        precio = a_centavos(precio)
+        stock = index(stock) if stock is not None else 0
+        for valor in (id_producto, precio, stock):
+            if not MIN_Q <= valor <= MAX_Q:
+                raise OverflowError(f"Producto {id_producto}: valor fuera de rango")
+
+        if not self.ids or id_producto > self.ids[-1]:
+            # el id va último: quien lo encuentre ya tiene el resto de la fila
+            self.precios.append(precio)
+            self.stock.append(stock)
+            self.nombres.append(nombre)
+            self.ids.append(id_producto)
+            return
+        i = bisect_left(self.ids, id_producto)
+        if self.ids[i] == id_producto:
+            self.precios[i] = precio
+            self.stock[i] = stock
+            self.nombres[i] = nombre
+        else:
+            self.ids.insert(i, id_producto)
+            self.precios.insert(i, precio)
+            self.stock.insert(i, stock)
+            self.nombres.insert(i, nombre)
+
+    def orden_por_nombre(self):
+        """array de ids ordenados por nombre (empates por id)."""
+        posiciones = sorted(range(len(self.ids)), key=self.nombres.__getitem__)
+        return array("q", map(self.ids.__getitem__, posiciones))
+
+    def values(self):
+        return map(self.fila, range(len(self.ids)))
+
+    def nbytes(self):
+        """Bytes de los arreglos y la lista de nombres (sin contar los str)."""
+        arreglos = sum(a.itemsize * len(a) for a in (self.ids, self.precios, self.stock))
+        return arreglos + 8 * len(self.nombres)
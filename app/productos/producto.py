@@ -1,4 +1,7 @@
 class Producto:
-    def __init__(self, nombre, precio):
+    __slots__ = ("nombre", "precio", "id_producto")
+
+    def __init__(self, nombre, precio, id_producto=None):
         self.nombre = nombre
         self.precio = precio
+        self.id_producto = id_producto
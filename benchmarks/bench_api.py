@@ -0,0 +1,153 @@
+"""Carga concurrente contra la API HTTP local (api.py), como varias cajas a la vez.
+
+    python benchmarks/bench_api.py                                # servidor propio sobre SQLite
+    python benchmarks/bench_api.py --conexiones 32 --pedidos 5000 --workers 4 --cola 16
+    python benchmarks/bench_api.py --workers 16 --agrupar-ms 5    # con commits agrupados
+    python benchmarks/bench_api.py --url 127.0.0.1:8080           # contra un servidor ya levantado
+
+Cada conexión (keep-alive) manda pedidos uno tras otro: mezcla de GET
+/productos?q= (sugerencias) y POST /facturas de 1-3 líneas. Se informa
+throughput, p50/p95/p99 por ruta y cuántos pedidos recibieron 503: con
+--cola chica y muchas conexiones tiene que haber 503 y la latencia de los que
+sí entran no debe dispararse. Con el servidor propio también se informan los
+commits por segundo y, con --agrupar-ms, el tamaño de los lotes del escritor
+agrupado y la espera que agrega a cada factura.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import db
+import escritor
+from metricas import Histograma
+
+
+def levantar(n, workers, cola, agrupar_ms=0, agrupar_max=None):
+    """Siembra un SQLite temporal y arranca api.Servidor en un hilo; devuelve (host, puerto)."""
+    import api
+    from bench_datos import preparar_sqlite, sembrar
+    from db import configure_pool
+    import sqlite_db
+
+    carpeta = tempfile.mkdtemp(prefix="bench_api_")
+    os.environ.setdefault("EASYFACT_COLA", os.path.join(carpeta, "cola.sqlite3"))
+    preparar_sqlite(carpeta, n)
+    sembrar(n, random.Random(1))
+    configure_pool(size=workers, connect=sqlite_db.conectar,
+                   database=os.path.join(carpeta, f"bench_{n}.sqlite3"))
+    if agrupar_ms > 0:
+        escritor.activar(agrupar_ms, agrupar_max)
+
+    servidor = api.Servidor(workers, cola)
+    listo = threading.Event()
+    direccion = []
+
+    def correr():
+        asyncio.run(servidor.servir("127.0.0.1", 0, lambda s: (
+            direccion.append(s.sockets[0].getsockname()[:2]), listo.set())))
+
+    threading.Thread(target=correr, daemon=True).start()
+    if not listo.wait(120):
+        sys.exit("El servidor no arrancó")
+    return direccion[0]
+
+
+async def pedir(reader, writer, metodo, ruta, cuerpo=None):
+    datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+    writer.write((f"{metodo} {ruta} HTTP/1.1\r\nHost: bench\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(datos)}\r\n\r\n").encode()
+                 + datos)
+    await writer.drain()
+    encabezado = await reader.readuntil(b"\r\n\r\n")
+    lineas = encabezado.decode("latin-1").split("\r\n")
+    estado = int(lineas[0].split(" ", 2)[1])
+    largo = 0
+    for linea in lineas[1:]:
+        if linea.lower().startswith("content-length:"):
+            largo = int(linea.split(":", 1)[1])
+    await reader.readexactly(largo)
+    return estado
+
+
+async def cliente(host, puerto, pedidos, n, rnd, latencias, estados):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        while pedidos:
+            pedidos.pop()
+            if rnd.random() < 0.5:
+                ruta, args = "GET /productos", ("GET", f"/productos?q=Producto%20{rnd.randint(0, 99):02d}")
+            else:
+                lineas = [{"id_producto": rnd.randint(1, n), "cantidad": rnd.randint(1, 3)}
+                          for _ in range(rnd.randint(1, 3))]
+                ruta, args = "POST /facturas", ("POST", "/facturas",
+                                                {"id_cliente": rnd.randint(1, n), "lineas": lineas})
+            t = time.perf_counter()
+            estado = await pedir(reader, writer, *args)
+            latencias.setdefault(ruta, Histograma()).agregar((time.perf_counter() - t) * 1000)
+            estados[estado] = estados.get(estado, 0) + 1
+    finally:
+        writer.close()
+
+
+async def cargar(host, puerto, conexiones, total, n):
+    pedidos = list(range(total))
+    latencias, estados = {}, {}
+    t = time.perf_counter()
+    await asyncio.gather(*(cliente(host, puerto, pedidos, n, random.Random(i), latencias, estados)
+                           for i in range(conexiones)))
+    return time.perf_counter() - t, latencias, estados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="host:puerto de un servidor ya levantado")
+    parser.add_argument("--tamano", type=int, default=2000, help="clientes/productos/facturas sembrados")
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--pedidos", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cola", type=int, default=8)
+    parser.add_argument("--agrupar-ms", type=float, default=0, help="activa el escritor agrupado")
+    parser.add_argument("--agrupar-max", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        host, puerto = args.url.rsplit(":", 1)
+        puerto = int(puerto)
+    else:
+        host, puerto = levantar(args.tamano, args.workers, args.cola, args.agrupar_ms, args.agrupar_max)
+    commits = 0 if args.url else db.tx_stats["commits"]
+
+    segundos, latencias, estados = asyncio.run(cargar(host, puerto, args.conexiones, args.pedidos,
+                                                      args.tamano))
+    print(f"{args.pedidos} pedidos en {segundos:.2f}s con {args.conexiones} conexiones: "
+          f"{args.pedidos / segundos:.0f} pedidos/s")
+    print("estados:", ", ".join(f"{k}={v}" for k, v in sorted(estados.items())))
+    print(f"{'ruta':<16} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for ruta, h in sorted(latencias.items()):
+        r = h.resumen()
+        print(f"{ruta:<16} {r['n']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    if args.url:
+        print("commits y lotes: ver GET /metricas del servidor")
+        return 0
+    print(f"commits: {db.tx_stats['commits'] - commits} ({(db.tx_stats['commits'] - commits) / segundos:.0f}/s)")
+    agrupado = escritor.get_escritor()
+    if agrupado is not None:
+        s = agrupado.stats()
+        print(f"escritor: {s['lotes']} lotes, {s['tamano_promedio']:.1f} facturas/lote (máx {s['tamano_max']}), "
+              f"espera p50 {s['espera']['p50_ms']:.1f} ms p95 {s['espera']['p95_ms']:.1f} ms, "
+              f"escritura p50 {s['escritura']['p50_ms']:.1f} ms, rechazadas {s['rechazadas']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
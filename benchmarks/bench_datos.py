@@ -0,0 +1,325 @@
+"""Latencia, throughput y memoria de los helpers de datos a medida que crece la base.
+
+    python benchmarks/bench_datos.py                              # 10k, SQLite temporal
+    python benchmarks/bench_datos.py --tamano 10000 --tamano 100000 --tamano 1000000
+    python benchmarks/bench_datos.py --mysql easyfact_bench       # base MySQL de pruebas
+    python benchmarks/bench_datos.py --comparar benchmarks/resultados/anterior.json
+    python benchmarks/bench_datos.py --mysql easyfact_bench --protocolo ambos   # texto vs preparado
+
+Para cada tamaño se siembran N clientes, N productos y N facturas (1-5
+líneas) y se mide cada helper con los mismos parámetros de la app: p50, p95,
+p99, máximo, operaciones por segundo y pico de memoria (tracemalloc) de una
+llamada. También se mide el arranque en procesos aparte: cuánto tarda en
+importarse cada punto de entrada (main, datos, facturacion_lote, interfaz) y,
+si hay display, construir App. El resultado se guarda en JSON en
+benchmarks/resultados/ para comparar versiones con --comparar.
+
+Por defecto la base es un SQLite temporal detrás de db.ConnectionPool (ver
+sqlite_db.py); con --mysql se usa esa base del servidor de db.DB_CONFIG, que
+se vacía y se vuelve a crear: no usar la base de producción.
+
+--protocolo elige si las sentencias del registro (db.registrar_sentencia) van
+preparadas en el servidor o como texto; con "ambos" se mide cada helper de
+las dos formas. SQLite ya reutiliza sus sentencias compiladas, así que la
+diferencia solo es representativa con --mysql.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import db
+import resumenes
+from db import conexion, configure_pool
+from catalogo import Catalogo
+from datos import (fetch_clients, fetch_products, fetch_invoices, get_client_id_by_name,
+                   get_product_by_name, insert_invoice_and_detail)
+import sqlite_db
+
+SEED_CHUNK = 5000
+RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+ESQUEMA_MYSQL = [
+    """CREATE TABLE clientes (
+        id_cliente INT AUTO_INCREMENT PRIMARY KEY, nombre VARCHAR(100) NOT NULL,
+        documento VARCHAR(30), direccion VARCHAR(150), telefono VARCHAR(30), correo VARCHAR(100),
+        INDEX (nombre))""",
+    """CREATE TABLE productos (
+        id_producto INT AUTO_INCREMENT PRIMARY KEY, nombre VARCHAR(100) NOT NULL,
+        descripcion VARCHAR(255), precio DECIMAL(10, 2) NOT NULL, stock INT NOT NULL,
+        INDEX (nombre))""",
+    """CREATE TABLE facturas (
+        id_factura INT AUTO_INCREMENT PRIMARY KEY, id_cliente INT NOT NULL, fecha DATE NOT NULL,
+        total DECIMAL(12, 2) NOT NULL, INDEX (fecha, id_factura), INDEX (id_cliente))""",
+    """CREATE TABLE detalle_factura (
+        id_detalle INT AUTO_INCREMENT PRIMARY KEY, id_factura INT NOT NULL, id_producto INT NOT NULL,
+        cantidad INT NOT NULL, precio DECIMAL(10, 2) NOT NULL, INDEX (id_factura))""",
+] + resumenes.DDL
+TABLAS = ("detalle_factura", "facturas", "productos", "clientes",
+          "ventas_dia", "ventas_cliente", "ventas_producto")
+
+
+def preparar_sqlite(carpeta, n):
+    ruta = os.path.join(carpeta, f"bench_{n}.sqlite3")
+    sqlite_db.crear_base(ruta)
+    configure_pool(size=4, connect=sqlite_db.conectar, database=ruta)
+    resumenes._tablas_listas = True
+
+
+def preparar_mysql(base):
+    if base == db.DB_CONFIG["database"]:
+        sys.exit(f"--mysql {base} es la base de la aplicación; usa una base de pruebas")
+    config = dict(db.DB_CONFIG, database=base)
+    with db.ConnectionPool(size=1, **{k: v for k, v in db.DB_CONFIG.items() if k != "database"}).connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{base}`")
+        cur.close()
+    configure_pool(size=4, **config)
+    with conexion() as conn:
+        cur = conn.cursor()
+        for tabla in TABLAS:
+            cur.execute(f"DROP TABLE IF EXISTS {tabla}")
+        for ddl in ESQUEMA_MYSQL:
+            cur.execute(ddl)
+        conn.commit()
+        cur.close()
+
+
+def sembrar(n, rnd):
+    hoy = date.today()
+    with conexion() as conn:
+        cur = conn.cursor()
+        for i in range(0, n, SEED_CHUNK):
+            rango = range(i, min(n, i + SEED_CHUNK))
+            cur.executemany("INSERT INTO clientes (nombre, documento, direccion, telefono, correo) "
+                            "VALUES (%s, %s, %s, %s, %s)",
+                            [(f"Cliente {k:07d}", str(10**9 + k), "Calle 1", "555", f"c{k}@x.co")
+                             for k in rango])
+            cur.executemany("INSERT INTO productos (nombre, descripcion, precio, stock) "
+                            "VALUES (%s, %s, %s, %s)",
+                            [(f"Producto {k:07d}", "bench", f"{rnd.randint(100, 99999) / 100:.2f}", 10**6)
+                             for k in rango])
+            conn.commit()
+        precios = {}
+        for i in range(0, n, SEED_CHUNK):
+            rango = range(i, min(n, i + SEED_CHUNK))
+            facturas, lineas = [], []
+            for k in rango:
+                items = []
+                for _ in range(rnd.randint(1, 5)):
+                    id_producto = rnd.randint(1, n)
+                    precio = precios.setdefault(id_producto, rnd.randint(100, 99999))
+                    items.append((id_producto, rnd.randint(1, 10), precio))
+                facturas.append((rnd.randint(1, n), (hoy - timedelta(days=rnd.randint(0, 365))).isoformat(),
+                                 f"{sum(c * p for _, c, p in items) / 100:.2f}"))
+                lineas.append(items)
+            cur.execute("SELECT COALESCE(MAX(id_factura), 0) FROM facturas")
+            base = cur.fetchone()[0]
+            cur.executemany("INSERT INTO facturas (id_cliente, fecha, total) VALUES (%s, %s, %s)", facturas)
+            cur.executemany("INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio) "
+                            "VALUES (%s, %s, %s, %s)",
+                            [(base + j + 1, id_producto, c, f"{p / 100:.2f}")
+                             for j, items in enumerate(lineas) for id_producto, c, p in items])
+            conn.commit()
+        cur.close()
+
+
+def resumen(muestras):
+    muestras = sorted(muestras)
+    p = lambda q: muestras[min(len(muestras) - 1, int(len(muestras) * q))] * 1000
+    total = sum(muestras)
+    return {"n": len(muestras), "p50_ms": p(0.5), "p95_ms": p(0.95), "p99_ms": p(0.99),
+            "max_ms": muestras[-1] * 1000, "ops_s": len(muestras) / total if total else 0.0}
+
+
+def medir(fn, veces):
+    fn(0)   # calentamiento: pool, caches de SQL
+    muestras = []
+    for i in range(veces):
+        t = time.perf_counter()
+        fn(i)
+        muestras.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn(veces)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dict(resumen(muestras), pico_kb=pico / 1024)
+
+
+def casos(n, rnd, veces):
+    ids = [rnd.randint(1, n) for _ in range(veces + 2)]
+    pagina = fetch_invoices(limit=200)
+    siguiente = (pagina[-1][2], pagina[-1][0]) if pagina else None
+
+    def catalogo(i):
+        Catalogo().refresh(full=True)
+
+    return {
+        "fetch_clients": (lambda i: fetch_clients(), max(3, veces // 20)),
+        "fetch_products": (lambda i: fetch_products(), max(3, veces // 20)),
+        "catalogo_refresh": (catalogo, max(3, veces // 20)),
+        "fetch_invoices_pagina": (lambda i: fetch_invoices(limit=200), veces),
+        "fetch_invoices_siguiente": (lambda i: fetch_invoices(limit=200, after=siguiente), veces),
+        "fetch_invoices_cliente": (lambda i: fetch_invoices(limit=200, id_clientes=[ids[i]]), veces),
+        "get_client_id_by_name": (lambda i: get_client_id_by_name(f"Cliente {ids[i] - 1:07d}"), veces),
+        "get_product_by_name": (lambda i: get_product_by_name(f"Producto {ids[i] - 1:07d}"), veces),
+        "insert_invoice_and_detail": (lambda i: insert_invoice_and_detail(ids[i], ids[-1 - i], 1, "1.00"),
+                                      veces),
+        "kpis": (lambda i: resumenes.kpis(), veces),
+    }
+
+
+IMPORTS_MEDIDOS = ("main", "datos", "facturacion_lote", "interfaz")
+
+
+def medir_import(modulo, veces=3):
+    """Mejor de veces: ms para importar modulo en un proceso nuevo."""
+    script = ("import sys, time; sys.path.insert(0, %r); t = time.perf_counter(); "
+              "import %s; print((time.perf_counter() - t) * 1000)" % (RAIZ, modulo))
+    tiempos = []
+    for _ in range(veces):
+        salida = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+        try:
+            tiempos.append(float(salida.stdout.strip()))
+        except ValueError:
+            return None
+    return min(tiempos)
+
+
+def medir_arranque():
+    """Import de los módulos de entrada y construcción de App, cada uno en un proceso nuevo."""
+    script = """
+import json, os, resource, sys, time
+sys.path.insert(0, %r)
+t = time.perf_counter()
+import interfaz
+r = {"import_interfaz_ms": (time.perf_counter() - t) * 1000}
+try:
+    t = time.perf_counter()
+    app = interfaz.App()
+    app.update_idletasks()
+    r["app_ms"] = (time.perf_counter() - t) * 1000
+    r["timings_ms"] = {k: v * 1000 for k, v in app.timings.items()}
+    app.cerrar()
+except Exception as e:
+    r["app_error"] = str(e)
+r["maxrss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps(r))
+""" % RAIZ
+    salida = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    try:
+        r = json.loads(salida.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        r = {"error": salida.stderr.strip()[-500:]}
+    r["import_ms"] = {m: medir_import(m) for m in IMPORTS_MEDIDOS}
+    return r
+
+
+def comparar(anterior, actual):
+    print(f"\nComparación con {anterior['version']} ({anterior['fecha']}):")
+    for n, datos in actual["tamanos"].items():
+        previo = anterior["tamanos"].get(n)
+        if not previo:
+            continue
+        print(f"  N={n}")
+        for helper, r in datos["helpers"].items():
+            p = previo["helpers"].get(helper)
+            if p:
+                cambio = (r["p50_ms"] / p["p50_ms"] - 1) * 100 if p["p50_ms"] else 0.0
+                print(f"    {helper:<28}{p['p50_ms']:9.2f} -> {r['p50_ms']:9.2f} ms  ({cambio:+.0f}%)")
+    previo = anterior.get("arranque", {}).get("import_ms", {})
+    for modulo, ms in actual.get("arranque", {}).get("import_ms", {}).items():
+        if previo.get(modulo) and ms is not None:
+            print(f"  import {modulo:<21}{previo[modulo]:9.2f} -> {ms:9.2f} ms")
+
+
+def version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip() or "?"
+    except OSError:
+        return "?"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamano", type=int, action="append",
+                        help="clientes/productos/facturas a sembrar (repetible, por defecto 10000)")
+    parser.add_argument("--veces", type=int, default=200, help="llamadas medidas por helper")
+    parser.add_argument("--mysql", metavar="BASE", help="usar esta base MySQL de pruebas en lugar de SQLite")
+    parser.add_argument("--salida", help="archivo JSON (por defecto benchmarks/resultados/<fecha>-<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--sin-arranque", action="store_true")
+    parser.add_argument("--protocolo", choices=("preparado", "texto", "ambos"), default="preparado",
+                        help="sentencias preparadas en el servidor, protocolo de texto o las dos")
+    args = parser.parse_args(argv)
+    protocolos = ["texto", "preparado"] if args.protocolo == "ambos" else [args.protocolo]
+
+    resultado = {"version": version(), "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+                 "python": platform.python_version(), "backend": "mysql" if args.mysql else "sqlite",
+                 "veces": args.veces, "protocolo": args.protocolo, "tamanos": {}}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n in args.tamano or [10000]:
+            rnd = random.Random(n)
+            if args.mysql:
+                preparar_mysql(args.mysql)
+            else:
+                preparar_sqlite(carpeta, n)
+            t = time.perf_counter()
+            sembrar(n, rnd)
+            siembra = time.perf_counter() - t
+            print(f"N={n}: sembrado en {siembra:.1f} s")
+            estado = rnd.getstate()
+            por_protocolo = {}
+            for protocolo in protocolos:
+                db.PREPARADAS = protocolo == "preparado"
+                rnd.setstate(estado)     # los mismos ids en cada protocolo
+                print(f" protocolo {protocolo}")
+                por_protocolo[protocolo] = helpers = {}
+                for nombre, (fn, veces) in casos(n, rnd, args.veces).items():
+                    helpers[nombre] = r = medir(fn, veces)
+                    print(f"  {nombre:<28} p50 {r['p50_ms']:8.2f}  p95 {r['p95_ms']:8.2f}  "
+                          f"p99 {r['p99_ms']:8.2f} ms  {r['ops_s']:9.0f}/s  {r['pico_kb']:9.0f} KiB")
+            if len(protocolos) > 1:
+                print(" texto -> preparado (p50):")
+                for nombre, r in por_protocolo["preparado"].items():
+                    t = por_protocolo["texto"][nombre]
+                    cambio = (r["p50_ms"] / t["p50_ms"] - 1) * 100 if t["p50_ms"] else 0.0
+                    print(f"  {nombre:<28}{t['p50_ms']:9.2f} -> {r['p50_ms']:9.2f} ms  ({cambio:+.0f}%)")
+            resultado["tamanos"][str(n)] = {"siembra_s": siembra, "helpers": helpers,
+                                            "protocolos": por_protocolo, "pool": db.pool_stats()}
+            db.get_pool().close_all()
+
+    resultado["maxrss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if not args.sin_arranque:
+        resultado["arranque"] = arranque = medir_arranque()
+        print("Arranque:", ", ".join(f"{k} {v:.1f}" for k, v in arranque.items()
+                                     if isinstance(v, (int, float))))
+        print("Import (ms, proceso nuevo):", ", ".join(
+            f"{m} {v:.1f}" if v is not None else f"{m} error" for m, v in arranque["import_ms"].items()))
+
+    salida = args.salida or os.path.join(
+        RESULTADOS, f"{time.strftime('%Y%m%d-%H%M%S')}-{resultado['version']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, default=str)
+    print("Resultados en", salida)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Documentos por segundo (XML + PDF) en un solo proceso vs un pool de procesos.
+
+    python benchmarks/bench_documentos.py --facturas 2000 --lineas 20
+
+Usa facturas sintéticas, así que no necesita base de datos.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.documentos.render import renderizar_lote
+
+
+def facturas_sinteticas(n, lineas):
+    rnd = random.Random(1)
+    docs = []
+    for i in range(1, n + 1):
+        items = []
+        for j in range(lineas):
+            cantidad = rnd.randint(1, 10)
+            precio = rnd.randint(100, 99999)
+            items.append({"id_producto": j, "producto": f"Producto {j} – ñandú", "cantidad": cantidad,
+                          "precio": f"{precio / 100:.2f}", "subtotal": f"{precio * cantidad / 100:.2f}"})
+        docs.append({"id_factura": i, "fecha": "2026-10-18",
+                     "total": f"{sum(float(x['subtotal']) for x in items):.2f}",
+                     "cliente": {"id_cliente": i, "nombre": f"Cliente Núñez {i}", "documento": str(10**8 + i)},
+                     "lineas": items})
+    return docs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--facturas", type=int, default=2000)
+    parser.add_argument("--lineas", type=int, default=20)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    docs = facturas_sinteticas(args.facturas, args.lineas)
+    for procesos in sorted({1, args.procesos}):
+        with tempfile.TemporaryDirectory() as carpeta:
+            t = time.perf_counter()
+            renderizar_lote(docs, carpeta, procesos=procesos)
+            segundos = time.perf_counter() - t
+        print(f"{procesos:>3} proceso(s): {args.facturas / segundos:8.0f} docs/s ({segundos:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
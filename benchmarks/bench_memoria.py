@@ -0,0 +1,150 @@
+"""Memoria del catálogo de productos y de un lote de facturas: forma anterior vs compacta.
+
+    python benchmarks/bench_memoria.py --productos 1000000 --facturas 30000 --lineas 3
+
+Catálogo: dict id -> (id, nombre, Decimal, stock) contra CatalogoProductos
+(arreglos). Lote: Factura con __dict__ y lista de (Producto, cantidad), como
+la arma facturacion_lote.armar_factura, contra la Factura con __slots__ y
+líneas en columnas. Se mide con tracemalloc lo que retiene cada estructura
+(los nombres se crean antes y los comparten las dos formas), el tiempo de
+armarla y el de búsquedas por id o de total(). También el orden por nombre
+que guarda Catalogo.productos(): lista de filas contra array de ids.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.productos.catalogo import CatalogoProductos
+from app.facturas.factura import Factura
+from app.facturas.totales import total_lineas
+
+
+# --- forma anterior (clases con __dict__), solo para comparar ---
+
+class ClienteAnterior:
+    def __init__(self, nombre, identificacion, id_cliente=None):
+        self.nombre = nombre
+        self.identificacion = identificacion
+        self.id_cliente = id_cliente
+
+
+class ProductoAnterior:
+    def __init__(self, nombre, precio, id_producto=None):
+        self.nombre = nombre
+        self.precio = precio
+        self.id_producto = id_producto
+
+
+class FacturaAnterior:
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.detalles = []
+        self.id_factura = None
+
+    def agregar_producto(self, producto, cantidad):
+        self.detalles.append((producto, cantidad))
+
+    def total(self):
+        return total_lineas((prod.precio, cant) for prod, cant in self.detalles)
+
+
+def medir(armar):
+    """(objeto, MiB retenidos, segundos) de armar()."""
+    gc.collect()
+    tracemalloc.start()
+    t = time.perf_counter()
+    objeto = armar()
+    segundos = time.perf_counter() - t
+    retenido = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objeto, retenido / 2**20, segundos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--productos", type=int, default=1000000)
+    parser.add_argument("--facturas", type=int, default=30000)
+    parser.add_argument("--lineas", type=int, default=3, help="líneas por factura")
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(1)
+    n = args.productos
+    crudas = [(k + 1, f"Producto {k:07d}", f"{rnd.randint(100, 99999) / 100:.2f}", rnd.randint(0, 500))
+              for k in range(n)]
+
+    def filas():
+        # como las entrega el conector: un Decimal nuevo por fila
+        return ((id_producto, nombre, Decimal(precio), stock) for id_producto, nombre, precio, stock in crudas)
+
+    print(f"Catálogo de {n} productos:")
+    resultados = {}
+    for nombre, armar in [("dict de tuplas", lambda: {f[0]: f for f in filas()}),
+                          ("CatalogoProductos", lambda: CatalogoProductos(filas()))]:
+        catalogo, mib, segundos = medir(armar)
+        t = time.perf_counter()
+        for id_producto in range(1, n + 1, max(1, n // 100000)):
+            catalogo.get(id_producto)
+        busqueda = time.perf_counter() - t
+        resultados[nombre] = mib
+        print(f"  {nombre:<22}{mib:9.1f} MiB  {mib * 2**20 / n:7.1f} B/producto  "
+              f"armado {segundos:6.2f} s  100k get {busqueda * 1000:7.1f} ms")
+        # orden por nombre que guarda Catalogo.productos(): lista de filas (forma anterior)
+        # o, con CatalogoProductos, solo un array de ids y las filas se arman al recorrer
+        formas = [("lista de filas", lambda: sorted(catalogo.values(), key=lambda r: r[1]))]
+        if not isinstance(catalogo, dict):
+            formas.append(("array de ids", catalogo.orden_por_nombre))
+        for forma, ordenar in formas:
+            orden, mib, segundos = medir(ordenar)
+            print(f"    productos() con {forma:<15}{mib:9.1f} MiB  armado {segundos:6.2f} s")
+            del orden
+        del catalogo
+    anterior, nuevo = resultados.values()
+    print(f"  ahorro: {anterior - nuevo:.1f} MiB ({(1 - nuevo / anterior) * 100:.0f}%)")
+
+    filas = list(filas())    # filas del catálogo que comparten las facturas de las dos formas
+    lote = [(rnd.randint(1, 10**6), [(rnd.randint(0, n - 1), rnd.randint(1, 10)) for _ in range(args.lineas)])
+            for _ in range(args.facturas)]
+
+    def armar(clase_factura, clase_cliente, clase_producto):
+        facturas = []
+        for id_cliente, lineas in lote:
+            factura = clase_factura(clase_cliente(None, None, id_cliente=id_cliente))
+            for k, cantidad in lineas:
+                row = filas[k]
+                factura.agregar_producto(clase_producto(row[1], row[2], id_producto=row[0]), cantidad)
+            facturas.append(factura)
+        return facturas
+
+    print(f"Lote de {args.facturas} facturas de {args.lineas} líneas:")
+    resultados = {}
+    for nombre, clases in [("__dict__ + tuplas", (FacturaAnterior, ClienteAnterior, ProductoAnterior)),
+                           ("__slots__ + columnas", (Factura, Cliente, Producto))]:
+        facturas, mib, segundos = medir(lambda: armar(*clases))
+        t = time.perf_counter()
+        total = sum(f.total() for f in facturas)
+        recorrer = time.perf_counter() - t
+        resultados[nombre] = mib
+        print(f"  {nombre:<22}{mib:9.1f} MiB  {mib * 2**20 / args.facturas:7.0f} B/factura  "
+              f"armado {segundos:6.2f} s  total() {recorrer * 1000:7.1f} ms  ({total})")
+        del facturas
+    anterior, nuevo = resultados.values()
+    print(f"  ahorro: {anterior - nuevo:.1f} MiB ({(1 - nuevo / anterior) * 100:.0f}%)")
+
+    print("Por instancia (sys.getsizeof, sin atributos):")
+    for clase in (ProductoAnterior, Producto, ClienteAnterior, Cliente):
+        objeto = clase(None, None)
+        extra = sys.getsizeof(objeto.__dict__) if hasattr(objeto, "__dict__") else 0
+        print(f"  {clase.__name__:<22}{sys.getsizeof(objeto) + extra:5d} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Contención de stock: N cajas venden a la vez los mismos productos contra una base local.
+
+    python benchmarks/bench_stock.py --cajas 16 --stock 2000 --productos 3
+
+Crea productos de prueba con el stock indicado, lanza --cajas hilos que
+guardan facturas de 1-3 unidades sobre esos productos (en orden aleatorio)
+hasta agotarlos, y verifica que lo vendido coincide exactamente con el stock
+inicial: ni sobreventa ni unidades perdidas. Necesita el MySQL de db.DB_CONFIG.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from db import conexion, configure_pool
+from datos import StockInsuficiente, insert_invoice
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.facturas.factura import Factura
+
+
+def preparar(n_productos, stock):
+    marca = uuid.uuid4().hex[:8]
+    with conexion() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO clientes (nombre, documento) VALUES (%s, %s)",
+                    (f"bench-{marca}", f"bench-{marca}"))
+        id_cliente = cur.lastrowid
+        ids = []
+        for i in range(n_productos):
+            cur.execute("INSERT INTO productos (nombre, descripcion, precio, stock) VALUES (%s, %s, %s, %s)",
+                        (f"bench-{marca}-{i}", "benchmark", "1.00", stock))
+            ids.append(cur.lastrowid)
+        conn.commit()
+        cur.close()
+    return id_cliente, ids
+
+
+def stock_actual(ids):
+    with conexion() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT SUM(stock) FROM productos WHERE id_producto IN ("
+                    + ", ".join(["%s"] * len(ids)) + ")", ids)
+        total = cur.fetchone()[0]
+        cur.close()
+    return int(total)
+
+
+def caja(id_cliente, ids, resultados, lock):
+    rnd = random.Random()
+    vendidas = facturas = agotadas = 0
+    latencias = []
+    agotados = set()
+    while len(agotados) < len(ids):
+        factura = Factura(Cliente(None, None, id_cliente=id_cliente))
+        disponibles = [i for i in ids if i not in agotados]
+        lineas = rnd.sample(disponibles, rnd.randint(1, len(disponibles)))
+        for id_producto in lineas:
+            factura.agregar_producto(Producto(None, "1.00", id_producto=id_producto), rnd.randint(1, 3))
+        t = time.perf_counter()
+        ok, err = insert_invoice(factura)
+        latencias.append(time.perf_counter() - t)
+        if ok:
+            facturas += 1
+            vendidas += sum(c for _, c in factura.detalles)
+        elif err and "Stock insuficiente" in err:
+            agotadas += 1
+            # con una sola línea se sabe qué producto se agotó
+            if len(lineas) == 1:
+                agotados.add(lineas[0])
+        else:
+            raise StockInsuficiente(err)
+    with lock:
+        resultados.append((vendidas, facturas, agotadas, latencias))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cajas", type=int, default=16)
+    parser.add_argument("--productos", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    configure_pool(size=args.cajas)
+    id_cliente, ids = preparar(args.productos, args.stock)
+    inicial = stock_actual(ids)
+
+    resultados, lock = [], threading.Lock()
+    hilos = [threading.Thread(target=caja, args=(id_cliente, ids, resultados, lock))
+             for _ in range(args.cajas)]
+    t = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    segundos = time.perf_counter() - t
+
+    final = stock_actual(ids)
+    vendidas = sum(r[0] for r in resultados)
+    facturas = sum(r[1] for r in resultados)
+    rechazos = sum(r[2] for r in resultados)
+    latencias = sorted(x for r in resultados for x in r[3])
+    p = lambda q: latencias[min(len(latencias) - 1, int(len(latencias) * q))] * 1000
+
+    print(f"{args.cajas} cajas, {args.productos} productos, stock inicial {inicial}")
+    print(f"  {facturas} facturas en {segundos:.2f} s ({facturas / segundos:.0f}/s), "
+          f"{rechazos} rechazadas por stock")
+    print(f"  latencia p50 {p(0.5):.1f} ms, p95 {p(0.95):.1f} ms, p99 {p(0.99):.1f} ms")
+    print(f"  reintentos por deadlock/lock wait: {db.tx_stats['retries']}, "
+          f"fallos: {db.tx_stats['failures'] - rechazos}")
+    print(f"  vendidas {vendidas}, stock final {final}: "
+          + ("OK" if inicial - final == vendidas and final >= 0 else "INCONSISTENTE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compara el cálculo de totales: bucle float por tupla vs Decimal vs arreglos en centavos.
+
+    python benchmarks/bench_totales.py --lineas 5000 --facturas 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.facturas.totales import LineasColumnares, a_centavos, total_lineas, totales_por_factura
+
+
+def medir(fn, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        resultado = fn()
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor, resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lineas", type=int, default=5000, help="líneas por factura")
+    parser.add_argument("--facturas", type=int, default=2000, help="facturas para el recálculo masivo")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(1)
+    precios = [Decimal(rnd.randint(1, 500000)).scaleb(-2) for _ in range(args.lineas)]
+    cantidades = [rnd.randint(1, 20) for _ in range(args.lineas)]
+    tuplas_float = [(float(p), c) for p, c in zip(precios, cantidades)]
+    tuplas_dec = list(zip(precios, cantidades))
+    columnas = LineasColumnares(tuplas_dec)
+
+    print(f"Una factura de {args.lineas} líneas:")
+    casos = [
+        ("float por tupla (actual)", lambda: sum(p * c for p, c in tuplas_float)),
+        ("Decimal por tupla", lambda: total_lineas(tuplas_dec)),
+        ("centavos en arreglos", columnas.total),
+    ]
+    for nombre, fn in casos:
+        t, total = medir(fn, args.repeticiones)
+        print(f"  {nombre:<26}{t * 1000:9.2f} ms   total={total}")
+
+    n_lineas = args.facturas * 20
+    ids = array("q", sorted(rnd.randrange(args.facturas) for _ in range(n_lineas)))
+    cents = array("q", (a_centavos(precios[i % len(precios)]) for i in range(n_lineas)))
+    cants = array("q", (cantidades[i % len(cantidades)] for i in range(n_lineas)))
+
+    def por_tupla():
+        totales = {}
+        for i, p, c in zip(ids, cents, cants):
+            totales[i] = totales.get(i, 0.0) + (p / 100) * c
+        return totales
+
+    def por_tupla_decimal():
+        totales = {}
+        for i, p, c in zip(ids, cents, cants):
+            totales[i] = totales.get(i, Decimal(0)) + Decimal(p).scaleb(-2) * c
+        return totales
+
+    print(f"Recalcular {args.facturas} facturas ({n_lineas} líneas):")
+    for nombre, fn in [("float por tupla (actual)", por_tupla),
+                       ("Decimal por tupla", por_tupla_decimal),
+                       ("centavos en arreglos", lambda: totales_por_factura(ids, cents, cants))]:
+        t, _ = medir(fn, args.repeticiones)
+        print(f"  {nombre:<26}{t * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
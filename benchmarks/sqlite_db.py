@@ -0,0 +1,130 @@
+"""Base SQLite que se hace pasar por MySQL detrás de db.ConnectionPool, para los benchmarks.
+
+    from sqlite_db import crear_base, conectar
+    crear_base(ruta)
+    configure_pool(size=4, connect=conectar, database=ruta)
+
+Traduce lo que usan los helpers (%s, CURDATE(), ON DUPLICATE KEY UPDATE,
+VALUES(col)) y expone la parte de la API de mysql.connector que usa la app:
+cursor(), execute/executemany (con SAVEPOINT), fetch*, lastrowid, rowcount, commit, rollback,
+in_transaction, is_connected. cursor(prepared=True) devuelve un cursor común:
+sqlite3 ya guarda en caché las sentencias compiladas. No pretende ser un MySQL completo: sirve para
+comparar versiones de la app contra sí mismas, no contra el servidor real.
+"""
+import re
+import sqlite3
+from decimal import Decimal
+from functools import lru_cache
+
+sqlite3.register_adapter(Decimal, str)
+
+ESQUEMA = [
+    """CREATE TABLE clientes (
+        id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL, documento TEXT, direccion TEXT, telefono TEXT, correo TEXT)""",
+    "CREATE INDEX ix_clientes_nombre ON clientes (nombre)",
+    """CREATE TABLE productos (
+        id_producto INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL, descripcion TEXT, precio NUMERIC NOT NULL, stock INTEGER NOT NULL)""",
+    "CREATE INDEX ix_productos_nombre ON productos (nombre)",
+    """CREATE TABLE facturas (
+        id_factura INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_cliente INTEGER NOT NULL, fecha TEXT NOT NULL, total NUMERIC NOT NULL)""",
+    "CREATE INDEX ix_facturas_fecha ON facturas (fecha, id_factura)",
+    "CREATE INDEX ix_facturas_cliente ON facturas (id_cliente)",
+    """CREATE TABLE detalle_factura (
+        id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_factura INTEGER NOT NULL, id_producto INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL, precio NUMERIC NOT NULL)""",
+    "CREATE INDEX ix_detalle_factura ON detalle_factura (id_factura)",
+    "CREATE TABLE ventas_dia (fecha TEXT PRIMARY KEY, facturas INTEGER NOT NULL DEFAULT 0, total NUMERIC NOT NULL DEFAULT 0)",
+    "CREATE TABLE ventas_cliente (id_cliente INTEGER PRIMARY KEY, facturas INTEGER NOT NULL DEFAULT 0, total NUMERIC NOT NULL DEFAULT 0)",
+    "CREATE TABLE ventas_producto (id_producto INTEGER PRIMARY KEY, cantidad INTEGER NOT NULL DEFAULT 0, total NUMERIC NOT NULL DEFAULT 0)",
+]
+
+
+@lru_cache(maxsize=512)
+def traducir(sql):
+    sql = sql.replace("DATE_FORMAT(CURDATE(), '%Y-%m-01')", "date('now', 'start of month')")
+    sql = sql.replace("%s", "?").replace("CURDATE()", "date('now')")
+    sql = sql.replace("ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET")
+    return re.sub(r"VALUES\((\w+)\)", r"excluded.\1", sql)
+
+
+class Cursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._cur = conn.cursor()
+
+    def execute(self, sql, params=()):
+        # como MySQL con autocommit apagado: un SAVEPOINT no abre una transacción propia
+        if sql.startswith("SAVEPOINT") and not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+        self._cur.execute(traducir(sql), tuple(params))
+
+    def executemany(self, sql, seq):
+        self._cur.executemany(traducir(sql), [tuple(p) for p in seq])
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cur.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def close(self):
+        self._cur.close()
+
+
+class Conexion:
+    def __init__(self, ruta):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._abierta = True
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def consume_results(self):
+        pass
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def is_connected(self):
+        return self._abierta
+
+    def close(self):
+        self._abierta = False
+        self._conn.close()
+
+
+def conectar(database, **_):
+    """Reemplazo de mysql.connector.connect para ConnectionPool(connect=...)."""
+    return Conexion(database)
+
+
+def crear_base(ruta):
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for ddl in ESQUEMA:
+        conn.execute(ddl)
+    conn.commit()
+    conn.close()
@@ -0,0 +1,100 @@
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Núñez' y 'nunez' quedan iguales."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceTrigramas:
+    """Índice de trigramas sobre nombres normalizados para búsquedas por subcadena.
+
+    buscar() intersecta las listas de los trigramas de la consulta y confirma
+    cada candidato con una comparación de subcadena, así que nunca devuelve
+    falsos positivos.
+    """
+
+    def __init__(self):
+        self._nombres = {}      # id -> nombre normalizado
+        self._postings = {}     # trigrama -> set de ids
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def clear(self):
+        self._nombres.clear()
+        self._postings.clear()
+
+    def add(self, id_, nombre):
+        if id_ in self._nombres:
+            self.remove(id_)
+        norm = normalizar(nombre)
+        self._nombres[id_] = norm
+        for t in trigramas(norm):
+            self._postings.setdefault(t, set()).add(id_)
+
+    def remove(self, id_):
+        norm = self._nombres.pop(id_, None)
+        if norm is None:
+            return
+        for t in trigramas(norm):
+            ids = self._postings.get(t)
+            if ids:
+                ids.discard(id_)
+                if not ids:
+                    del self._postings[t]
+
+    def buscar(self, texto):
+        consulta = normalizar(texto).strip()
+        if not consulta:
+            return set(self._nombres)
+        tris = trigramas(consulta)
+        if not tris:
+            # consultas de 1-2 letras no tienen trigramas: se recorre
+            return {i for i, n in self._nombres.items() if consulta in n}
+
+        listas = sorted((self._postings.get(t, set()) for t in tris), key=len)
+        candidatos = set(listas[0])
+        for ids in listas[1:]:
+            candidatos &= ids
+            if not candidatos:
+                return set()
+        return {i for i in candidatos if consulta in self._nombres[i]}
+
+
+class IndicePrefijos:
+    """Nombres ordenados por su forma normalizada para autocompletar con bisect.
+
+    Los datos se guardan en una tupla que se reemplaza entera al actualizar, de
+    modo que buscar() puede llamarse desde el hilo de Tk sin tomar locks.
+    """
+
+    def __init__(self):
+        self._datos = ([], [])      # (claves normalizadas, nombres), en paralelo
+
+    def __len__(self):
+        return len(self._datos[0])
+
+    def reconstruir(self, nombres):
+        pares = sorted((normalizar(n), n) for n in nombres)
+        self._datos = ([p[0] for p in pares], [p[1] for p in pares])
+
+    def agregar(self, nombres):
+        if not nombres:
+            return
+        claves, actuales = self._datos
+        pares = sorted(list(zip(claves, actuales)) + [(normalizar(n), n) for n in nombres])
+        self._datos = ([p[0] for p in pares], [p[1] for p in pares])
+
+    def buscar(self, prefijo, limite=50):
+        claves, nombres = self._datos
+        prefijo = normalizar(prefijo)
+        i = bisect_left(claves, prefijo)
+        j = bisect_right(claves, prefijo + "\uffff", lo=i, hi=min(len(claves), i + limite))
+        return nombres[i:j]
@@ -0,0 +1,261 @@
+import threading
+import time
+
+from mysql.connector import Error
+
+from db import conexion, es_sin_conexion
+from busqueda import IndicePrefijos, IndiceTrigramas
+from app.facturas.totales import a_decimal
+from app.productos.catalogo import CatalogoProductos
+
+CATALOG_TTL = 300   # segundos antes de recargar todo el catálogo
+OFFLINE_RETRY = 10  # sin conexión, segundos sin volver a intentar (se sirve lo que hay en memoria)
+MISS_TTL = 5        # segundos que un nombre o id desconocido no vuelve a consultar la base
+
+
+class Catalogo:
+    """Copia en memoria de clientes y productos.
+
+    Resuelve nombres a ids sin consultar la base. Después de una invalidación
+    solo se traen las filas nuevas (id mayor al último visto); cuando vence el
+    TTL se recarga la tabla completa para recoger cambios y borrados. Si MySQL
+    no responde se sigue sirviendo la última copia y no se reintenta hasta
+    pasados OFFLINE_RETRY segundos.
+
+    Un nombre o id que no está dispara una carga de filas nuevas, pero esa
+    consulta corre sin el lock global (ver _traer_nuevas): las demás búsquedas
+    siguen respondiendo desde memoria. Lo que sigue sin aparecer se recuerda
+    MISS_TTL segundos para no repetir la consulta con cada pedido.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+
+        self._clientes = {}              # id_cliente -> (id_cliente, nombre)
+        self._cliente_por_nombre = {}
+        self._indice_clientes = IndiceTrigramas()
+        self._productos = CatalogoProductos()   # id_producto -> (id_producto, nombre, precio, stock)
+        self._producto_por_nombre = {}
+        self._prefijos = {"clientes": IndicePrefijos(), "productos": IndicePrefijos()}
+        self._max_id = {"clientes": 0, "productos": 0}
+        self._cargado = {"clientes": None, "productos": None}
+        self._sucio = {"clientes": True, "productos": True}
+        self._ordenados = {}
+        self._reintentar_en = 0
+        self._cargando = {"clientes": threading.Lock(), "productos": threading.Lock()}
+        self._ausentes = {"clientes": {}, "productos": {}}   # clave -> hasta cuándo no se busca
+
+        self.hits = 0
+        self.misses = 0
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def _consultar(self, sql, params=()):
+        if time.monotonic() < self._reintentar_en:
+            return None
+        try:
+            with conexion() as conn:
+                if conn:
+                    cur = conn.cursor()
+                    cur.execute(sql, params)
+                    rows = cur.fetchall()
+                    cur.close()
+                    return rows
+        except Error as e:
+            if not es_sin_conexion(e):
+                raise
+        self._reintentar_en = time.monotonic() + OFFLINE_RETRY
+        return None
+
+    @staticmethod
+    def _sql(tabla, completo):
+        if tabla == "clientes":
+            sql, pk = "SELECT id_cliente, nombre FROM clientes", "id_cliente"
+        else:
+            sql, pk = "SELECT id_producto, nombre, precio, stock FROM productos", "id_producto"
+        # en orden de id: CatalogoProductos agrega al final sin reordenar
+        if completo:
+            return sql + f" ORDER BY {pk}"
+        return sql + f" WHERE {pk} > %s ORDER BY {pk}"
+
+    def _cargar(self, tabla, completo):
+        params = () if completo else (self._max_id[tabla],)
+        return self._aplicar(tabla, self._consultar(self._sql(tabla, completo), params), completo)
+
+    def _aplicar(self, tabla, rows, completo):
+        if rows is None:
+            return False
+        if tabla == "clientes":
+            filas, por_nombre = self._clientes, self._cliente_por_nombre
+        else:
+            filas, por_nombre = self._productos, self._producto_por_nombre
+        if not completo:
+            # otro hilo pudo cargar las mismas filas mientras se consultaba
+            rows = [r for r in rows if r[0] > self._max_id[tabla]]
+
+        indice = self._indice_clientes if tabla == "clientes" else None
+        if completo:
+            filas.clear()
+            por_nombre.clear()
+            if indice is not None:
+                indice.clear()
+            self._max_id[tabla] = 0
+            self._cargado[tabla] = time.monotonic()
+            self.full_loads += 1
+        else:
+            self.incremental_loads += 1
+
+        for row in rows:
+            try:
+                filas[row[0]] = row
+            except (TypeError, ValueError, ArithmeticError):
+                continue        # producto sin precio válido: no se puede vender desde el catálogo
+            por_nombre[row[1]] = row[0]
+            if indice is not None:
+                indice.add(row[0], row[1])
+            self._max_id[tabla] = max(self._max_id[tabla], row[0])
+        if completo:
+            self._prefijos[tabla].reconstruir([r[1] for r in rows])
+        else:
+            self._prefijos[tabla].agregar([r[1] for r in rows])
+        self._sucio[tabla] = False
+        self._ordenados.pop(tabla, None)
+        if completo or rows:
+            self._ausentes[tabla].clear()
+        return True
+
+    def _asegurar(self, tabla):
+        cargado = self._cargado[tabla]
+        if cargado is None or time.monotonic() - cargado > self.ttl:
+            self._cargar(tabla, completo=True)
+        elif self._sucio[tabla]:
+            self._cargar(tabla, completo=False)
+
+    def refresh(self, full=False):
+        with self._lock:
+            for tabla in ("clientes", "productos"):
+                if full:
+                    self._cargar(tabla, completo=True)
+                else:
+                    self._asegurar(tabla)
+
+    def invalidate(self, tabla=None, full=False):
+        with self._lock:
+            for t in ((tabla,) if tabla else ("clientes", "productos")):
+                self._sucio[t] = True
+                self._ausentes[t].clear()
+                if full:
+                    self._cargado[t] = None
+
+    def clientes(self):
+        with self._lock:
+            self._asegurar("clientes")
+            if "clientes" not in self._ordenados:
+                self._ordenados["clientes"] = sorted(self._clientes.values(), key=lambda r: r[1])
+            return self._ordenados["clientes"]
+
+    def productos(self):
+        """Filas (id_producto, nombre, precio, stock) ordenadas por nombre.
+
+        Se guarda solo el orden (un array de ids, 8 bytes por producto) y cada
+        fila se arma al recorrerla: una lista de tuplas con su Decimal ocuparía
+        lo que CatalogoProductos ahorra.
+        """
+        with self._lock:
+            self._asegurar("productos")
+            productos = self._productos
+            orden = self._ordenados.get("productos")
+            if orden is None:
+                orden = self._ordenados["productos"] = productos.orden_por_nombre()
+        return (fila for fila in map(productos.get, orden) if fila is not None)
+
+    def _traer_nuevas(self, tabla, clave, buscar):
+        """buscar() después de traer las filas nuevas de tabla; para claves que no están.
+
+        Se llama sin el lock global. La consulta corre con el lock de la tabla
+        (una sola carga a la vez; si otro hilo ya cargó mientras se esperaba, no
+        se repite) y el lock global solo se toma para aplicar las filas.
+        """
+        ausentes = self._ausentes[tabla]
+        with self._lock:
+            self._asegurar(tabla)
+            encontrado = buscar()
+            if encontrado is not None:
+                self.hits += 1
+                return encontrado
+            self.misses += 1
+            if ausentes.get(clave, 0) > time.monotonic():
+                return None
+            visto = self._max_id[tabla]
+        # la clave puede ser de una fila creada desde otra terminal
+        with self._cargando[tabla]:
+            with self._lock:
+                desde = self._max_id[tabla]
+            rows = self._consultar(self._sql(tabla, False), (desde,)) if desde == visto else None
+            with self._lock:
+                self._aplicar(tabla, rows, completo=False)
+                encontrado = buscar()
+                if encontrado is None:
+                    ausentes[clave] = time.monotonic() + MISS_TTL
+                return encontrado
+
+    def _buscar(self, tabla, por_nombre, nombre):
+        return self._traer_nuevas(tabla, nombre, lambda: por_nombre.get(nombre))
+
+    def cliente_id(self, nombre):
+        return self._buscar("clientes", self._cliente_por_nombre, nombre)
+
+    def producto(self, nombre):
+        id_producto = self._buscar("productos", self._producto_por_nombre, nombre)
+        row = self._productos.get(id_producto)
+        if row is None:
+            return None, None
+        return row[0], a_decimal(row[2])
+
+    def buscar_clientes(self, texto):
+        """ids de los clientes cuyo nombre contiene texto, sin importar tildes ni mayúsculas."""
+        with self._lock:
+            self._asegurar("clientes")
+            return self._indice_clientes.buscar(texto)
+
+    def sugerir(self, tabla, texto, limite=50):
+        """Primeros nombres que empiezan con texto; no toma el lock ni consulta la base."""
+        return self._prefijos[tabla].buscar(texto, limite)
+
+    def producto_por_id(self, id_producto):
+        """Fila (id_producto, nombre, precio, stock) o None; recarga si el id es nuevo."""
+        return self._traer_nuevas("productos", id_producto, lambda: self._productos.get(id_producto))
+
+    def precio(self, nombre):
+        """Precio en caché del producto, sin consultar la base (None si no está)."""
+        row = self._productos.get(self._producto_por_nombre.get(nombre))
+        return row[2] if row else None
+
+    def stats(self):
+        """Contadores sin tomar el lock: refresh lo tiene durante las consultas y
+        esto se llama desde el hilo de Tk. Durante una recarga pueden salir un
+        poco desparejos, da igual para diagnóstico."""
+        return {
+            "clientes": len(self._clientes),
+            "productos": len(self._productos),
+            "productos_kb": self._productos.nbytes() / 1024,
+            "hits": self.hits,
+            "misses": self.misses,
+            "full_loads": self.full_loads,
+            "incremental_loads": self.incremental_loads,
+            "sin_conexion": time.monotonic() < self._reintentar_en,
+        }
+
+
+_catalogo = None
+_catalogo_lock = threading.Lock()
+
+
+def get_catalogo():
+    global _catalogo
+    if _catalogo is None:
+        with _catalogo_lock:
+            if _catalogo is None:
+                _catalogo = Catalogo()
+    return _catalogo
@@ -0,0 +1,214 @@
+"""Cola local de operaciones hechas sin conexión a MySQL.
+
+    python cola_offline.py              # muestra lo pendiente y sincroniza
+    python cola_offline.py --listar     # solo muestra lo pendiente
+
+Cuando MySQL no está alcanzable, las facturas, clientes y productos nuevos se
+guardan en un SQLite local (modo WAL, synchronous=FULL: lo encolado sobrevive
+a un corte de luz) con una clave de idempotencia. sincronizar() los reenvía en
+orden, de a lotes; cada operación registra su clave en operaciones_aplicadas en
+la misma transacción, así que si el proceso se cae entre el commit en MySQL y
+el borrado local, al reintentar se reconoce como ya aplicada y no se duplica.
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from mysql.connector import Error
+
+import resumenes
+from db import PoolAgotado, es_sin_conexion, run_transaction
+from datos import (SQL_INSERT_CLIENTE, SQL_INSERT_PRODUCTO, SQL_MARCAR_APLICADA, asegurar_aplicadas,
+                   write_invoices)
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.facturas.factura import Factura
+from app.documentos import firma
+
+RUTA_COLA = os.environ.get(
+    "EASYFACT_COLA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "cola_offline.sqlite3"),
+)
+SYNC_BATCH = 100
+
+_conn = None
+_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+
+def _local():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(RUTA_COLA), exist_ok=True)
+        _conn = sqlite3.connect(RUTA_COLA, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=FULL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS pendientes (
+                             id INTEGER PRIMARY KEY AUTOINCREMENT,
+                             clave TEXT NOT NULL UNIQUE,
+                             tipo TEXT NOT NULL,
+                             datos TEXT NOT NULL,
+                             creado REAL NOT NULL,
+                             error TEXT)""")
+    return _conn
+
+
+def encolar(tipo, datos, clave=None):
+    """Guarda la operación localmente; devuelve su clave de idempotencia.
+
+    clave es la del intento en línea que falló (ver datos.insert_invoice), así
+    si ese intento llegó a confirmarse la sincronización lo reconoce.
+    """
+    clave = clave or uuid.uuid4().hex
+    with _lock:
+        _local().execute("INSERT INTO pendientes (clave, tipo, datos, creado) VALUES (?, ?, ?, ?)",
+                         (clave, tipo, json.dumps(datos, default=str), time.time()))
+    return clave
+
+
+def encolar_factura(factura, clave=None):
+    return encolar("factura", {
+        "fecha": time.strftime("%Y-%m-%d"),
+        "id_cliente": factura.cliente.id_cliente,
+        "lineas": [[prod.id_producto, cant, str(prod.precio)] for prod, cant in factura.detalles],
+    }, clave)
+
+
+def pendientes(incluir_rechazadas=False):
+    """Cantidad de operaciones esperando sincronizarse."""
+    if _conn is None and not os.path.exists(RUTA_COLA):
+        return 0
+    sql = "SELECT COUNT(*) FROM pendientes"
+    if not incluir_rechazadas:
+        sql += " WHERE error IS NULL"
+    with _lock:
+        return _local().execute(sql).fetchone()[0]
+
+
+def listar():
+    with _lock:
+        return _local().execute("SELECT id, clave, tipo, datos, creado, error FROM pendientes "
+                                "ORDER BY id").fetchall()
+
+
+def _aplicar(cur, tipo, datos):
+    if tipo == "cliente":
+        cur.execute(SQL_INSERT_CLIENTE, (datos["nombre"], datos["documento"], datos["direccion"],
+                                         datos["telefono"], datos["correo"]))
+    elif tipo == "producto":
+        cur.execute(SQL_INSERT_PRODUCTO, (datos["nombre"], datos["descripcion"], datos["precio"],
+                                          datos["stock"]))
+    elif tipo == "factura":
+        factura = Factura(Cliente(None, None, id_cliente=datos["id_cliente"]))
+        try:
+            for id_producto, cantidad, precio in datos["lineas"]:
+                factura.agregar_producto(Producto(None, precio, id_producto=id_producto), cantidad)
+        except (ValueError, TypeError, ArithmeticError) as e:
+            # queda marcada como rechazada en lugar de cortar la sincronización
+            raise Error(f"Factura inválida: {e}")
+        return write_invoices(cur, [factura], fecha=datos["fecha"])[0]
+    else:
+        raise Error(f"Operación desconocida: {tipo}")
+
+
+def _aplicar_lote(cur, filas):
+    """Aplica las filas que no estén ya registradas; devuelve los id_factura creados."""
+    # DDL antes de cualquier cambio: hace commit implícito
+    resumenes.asegurar_tablas(cur)
+    asegurar_aplicadas(cur)
+    claves = [f[1] for f in filas]
+    cur.execute("SELECT clave FROM operaciones_aplicadas WHERE clave IN ("
+                + ", ".join(["%s"] * len(claves)) + ")", claves)
+    ya = {r[0] for r in cur.fetchall()}
+    facturas = []
+    for _, clave, tipo, datos in filas:
+        if clave in ya:
+            continue
+        id_factura = _aplicar(cur, tipo, json.loads(datos))
+        if id_factura is not None:
+            facturas.append(id_factura)
+        cur.execute(SQL_MARCAR_APLICADA, (clave, tipo))
+    return facturas
+
+
+def _borrar(ids):
+    with _lock:
+        _local().executemany("DELETE FROM pendientes WHERE id = ?", [(i,) for i in ids])
+
+
+def sincronizar(batch=SYNC_BATCH):
+    """Reenvía lo pendiente a MySQL. Devuelve (aplicadas, rechazadas, facturas creadas).
+
+    Cada lote va en una transacción. Si un lote falla por los datos (p. ej.
+    stock insuficiente) se reintenta de a una operación para aislar la que
+    falla, que queda marcada con su error y no vuelve a intentarse. Si se
+    corta la conexión, se detiene y lo que falta queda para la próxima vez.
+    """
+    if not _sync_lock.acquire(blocking=False):
+        return 0, 0, []
+    aplicadas = rechazadas = 0
+    facturas = []
+    try:
+        conectado = True
+        while conectado:
+            with _lock:
+                filas = _local().execute("SELECT id, clave, tipo, datos FROM pendientes "
+                                         "WHERE error IS NULL ORDER BY id LIMIT ?", (batch,)).fetchall()
+            if not filas:
+                break
+            try:
+                facturas += run_transaction(lambda cur: _aplicar_lote(cur, filas))
+                _borrar([f[0] for f in filas])
+                aplicadas += len(filas)
+                continue
+            except Error as e:
+                # sin conexión o con el pool saturado se sigue en la próxima pasada
+                if es_sin_conexion(e) or isinstance(e, PoolAgotado):
+                    break
+            for fila in filas:
+                try:
+                    facturas += run_transaction(lambda cur: _aplicar_lote(cur, [fila]))
+                except Error as e:
+                    if es_sin_conexion(e) or isinstance(e, PoolAgotado):
+                        conectado = False
+                        break
+                    with _lock:
+                        _local().execute("UPDATE pendientes SET error = ? WHERE id = ?", (str(e), fila[0]))
+                    rechazadas += 1
+                    continue
+                _borrar([fila[0]])
+                aplicadas += 1
+    finally:
+        _sync_lock.release()
+    if facturas and firma.hay_clave():
+        # las facturas creadas al sincronizar se firman aquí; si falla las toma firmar.py
+        from firmar import firmar_facturas
+        try:
+            firmar_facturas(facturas)
+        except (Error, OSError):
+            pass
+    return aplicadas, rechazadas, facturas
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Cola de operaciones sin conexión")
+    parser.add_argument("--listar", action="store_true", help="solo muestra lo pendiente")
+    args = parser.parse_args(argv)
+
+    for id_, clave, tipo, datos, creado, error in listar():
+        estado = f"RECHAZADA: {error}" if error else "pendiente"
+        print(f"{id_:>6} {time.strftime('%Y-%m-%d %H:%M', time.localtime(creado))} {tipo:<9} {estado}")
+    if args.listar:
+        return 0
+    aplicadas, rechazadas, _ = sincronizar()
+    print(f"{aplicadas} sincronizadas, {rechazadas} rechazadas, {pendientes()} pendientes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
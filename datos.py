@@ -0,0 +1,316 @@
+"""Acceso a datos de la aplicación (clientes, productos, facturas), sin Tk.
+
+Lo usan las pantallas de interfaz.py y también los scripts y procesos por lote,
+que así no cargan tkinter ni los íconos.
+"""
+import os
+import sys
+import uuid
+
+from mysql.connector import Error
+
+import resumenes
+from db import (SENTENCIAS, conexion, consultar, ejecutar, es_sin_conexion, filtro_ids,
+                registrar_sentencia, run_transaction)
+from catalogo import get_catalogo
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.facturas.factura import Factura
+from app.facturas.totales import a_decimal, de_centavos
+
+
+def fetch_clients():
+    with conexion() as conn:
+        if not conn:
+            return []
+        cur = conn.cursor()
+        cur.execute("SELECT id_cliente, nombre FROM clientes ORDER BY nombre")
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+
+def fetch_products():
+    with conexion() as conn:
+        if not conn:
+            return []
+        cur = conn.cursor()
+        cur.execute("SELECT id_producto, nombre, precio, stock FROM productos ORDER BY nombre")
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+
+SQL_INSERT_CLIENTE = """INSERT INTO clientes (nombre, documento, direccion, telefono, correo)
+                        VALUES (%s, %s, %s, %s, %s)"""
+SQL_INSERT_PRODUCTO = """INSERT INTO productos (nombre, descripcion, precio, stock)
+                         VALUES (%s, %s, %s, %s)"""
+MSG_EN_COLA = "Sin conexión: quedó guardado en este equipo y se enviará al volver la conexión"
+
+# claves de idempotencia de las operaciones que pueden terminar en la cola offline
+DDL_APLICADAS = """CREATE TABLE IF NOT EXISTS operaciones_aplicadas (
+    clave CHAR(32) PRIMARY KEY,
+    tipo VARCHAR(16) NOT NULL,
+    aplicado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)"""
+SQL_MARCAR_APLICADA = "INSERT INTO operaciones_aplicadas (clave, tipo) VALUES (%s, %s)"
+_aplicadas_lista = False
+
+
+def asegurar_aplicadas(cur):
+    """Crea operaciones_aplicadas una vez por proceso; DDL: antes de cualquier cambio."""
+    global _aplicadas_lista
+    if not _aplicadas_lista:
+        cur.execute(DDL_APLICADAS)
+        _aplicadas_lista = True
+
+
+def _con_clave(clave, tipo, sql, params):
+    """fn(cur) que ejecuta sql y registra clave en la misma transacción.
+
+    Si la conexión se corta durante o después del COMMIT no se sabe si quedó
+    aplicada: se encola con la misma clave y al sincronizar se salta si ya está.
+    """
+    def fn(cur):
+        asegurar_aplicadas(cur)
+        cur.execute(sql, params)
+        cur.execute(SQL_MARCAR_APLICADA, (clave, tipo))
+    return fn
+
+
+def insert_client(nombre, documento, direccion, telefono, correo):
+    clave = uuid.uuid4().hex
+    try:
+        run_transaction(_con_clave(clave, "cliente", SQL_INSERT_CLIENTE,
+                                   (nombre, documento, direccion, telefono, correo)))
+    except Error as e:
+        if es_sin_conexion(e):
+            import cola_offline   # solo hace falta sin conexión
+            cola_offline.encolar("cliente", {"nombre": nombre, "documento": documento,
+                                             "direccion": direccion, "telefono": telefono,
+                                             "correo": correo}, clave)
+            return True, MSG_EN_COLA
+        return False, str(e)
+    get_catalogo().invalidate("clientes")
+    return True, None
+
+
+def insert_product(nombre, descripcion, precio, stock):
+    clave = uuid.uuid4().hex
+    try:
+        run_transaction(_con_clave(clave, "producto", SQL_INSERT_PRODUCTO,
+                                   (nombre, descripcion, precio, stock)))
+    except Error as e:
+        if es_sin_conexion(e):
+            import cola_offline
+            cola_offline.encolar("producto", {"nombre": nombre, "descripcion": descripcion,
+                                              "precio": str(precio), "stock": stock}, clave)
+            return True, MSG_EN_COLA
+        return False, str(e)
+    get_catalogo().invalidate("productos")
+    return True, None
+
+
+# sentencias que van preparadas en el servidor (ver db.Sentencias)
+CLIENTE_POR_NOMBRE = registrar_sentencia(
+    "cliente_por_nombre", "SELECT id_cliente FROM clientes WHERE nombre = %s LIMIT 1")
+PRODUCTO_POR_NOMBRE = registrar_sentencia(
+    "producto_por_nombre", "SELECT id_producto, precio FROM productos WHERE nombre = %s LIMIT 1")
+
+
+def get_client_id_by_name(nombre):
+    with conexion() as conn:
+        if not conn:
+            return None
+        rows = consultar(conn, CLIENTE_POR_NOMBRE, (nombre,))
+    return rows[0][0] if rows else None
+
+
+def get_product_by_name(nombre):
+    with conexion() as conn:
+        if not conn:
+            return None, None
+        rows = consultar(conn, PRODUCTO_POR_NOMBRE, (nombre,))
+    if rows:
+        return rows[0][0], a_decimal(rows[0][1])
+    return None, None
+
+
+SQL_DESCONTAR_STOCK = ("UPDATE productos SET stock = stock - %s "
+                       "WHERE id_producto = %s AND stock >= %s")
+SQL_INSERT_FACTURA = ("INSERT INTO facturas (id_cliente, fecha, total) "
+                      "VALUES (%s, COALESCE(%s, CURDATE()), %s)")
+SQL_INSERT_DETALLE = ("INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio) "
+                      "VALUES (%s, %s, %s, %s)")
+# hasta esta cantidad de líneas el INSERT de detalle va preparado, uno por cantidad;
+# los lotes más grandes siguen con executemany (el conector arma un INSERT de varias filas)
+MAX_LINEAS_PREPARADAS = 20
+
+
+def insert_details(cur, detalles):
+    """Inserta las líneas (id_factura, id_producto, cantidad, precio) en un solo INSERT."""
+    if len(detalles) > MAX_LINEAS_PREPARADAS:
+        cur.executemany(SQL_INSERT_DETALLE, detalles)
+        return
+    nombre = f"detalle_factura:{len(detalles)}"
+    if nombre not in SENTENCIAS:
+        registrar_sentencia(nombre, SQL_INSERT_DETALLE + ", (%s, %s, %s, %s)" * (len(detalles) - 1))
+    ejecutar(cur, nombre, [v for detalle in detalles for v in detalle])
+
+
+class StockInsuficiente(Error):
+    pass
+
+
+def reserve_stock(cur, facturas):
+    """Descuenta el stock de todas las líneas, o lanza StockInsuficiente.
+
+    Los productos se actualizan en orden de id_producto para que dos cajas que
+    venden los mismos productos tomen los locks en el mismo orden y no se
+    bloqueen mutuamente.
+    """
+    cantidades = {}
+    for factura in facturas:
+        for id_producto, _, cant in factura.detalles.filas():
+            cantidades[id_producto] = cantidades.get(id_producto, 0) + cant
+    for id_producto in sorted(cantidades):
+        cant = cantidades[id_producto]
+        cur.execute(SQL_DESCONTAR_STOCK, (cant, id_producto, cant))
+        if cur.rowcount != 1:
+            raise StockInsuficiente(f"Stock insuficiente para el producto {id_producto}")
+
+
+def write_invoices(cur, facturas, descontar_stock=True, fecha=None, claves=None):
+    """Inserta los encabezados y, en un solo executemany, las líneas de todas las facturas.
+
+    No hace commit: el llamador decide el tamaño de la transacción. Con
+    descontar_stock primero se reserva el stock de todas las líneas en la misma
+    transacción. fecha (AAAA-MM-DD) reemplaza a la del servidor, p. ej. al
+    sincronizar ventas hechas sin conexión. claves (una por factura) se
+    registran en operaciones_aplicadas con la factura. Devuelve los id_factura
+    en el mismo orden que facturas.
+    """
+    resumenes.asegurar_tablas(cur)
+    if claves is not None:
+        asegurar_aplicadas(cur)
+    if descontar_stock:
+        reserve_stock(cur, facturas)
+    ids, detalles = [], []
+    for factura in facturas:
+        cur.execute(SQL_INSERT_FACTURA, (factura.cliente.id_cliente, fecha, factura.total()))
+        id_factura = cur.lastrowid
+        ids.append(id_factura)
+        if claves is not None:
+            cur.execute(SQL_MARCAR_APLICADA, (claves[len(ids) - 1], "factura"))
+        detalles += [(id_factura, id_producto, cant, de_centavos(centavos))
+                     for id_producto, centavos, cant in factura.detalles.filas()]
+    if detalles:
+        insert_details(cur, detalles)
+    resumenes.acumular(cur, facturas, fecha)
+    return ids
+
+
+def insert_invoice(factura):
+    """Guarda la factura completa (encabezado + todas sus líneas) en una sola transacción.
+
+    Sin conexión la factura se encola localmente (ver cola_offline): devuelve
+    (True, MSG_EN_COLA) y factura.id_factura queda en None. La clave de
+    idempotencia se crea antes del primer intento y se guarda con la factura:
+    si la conexión se cae durante el COMMIT y la factura sí quedó, al
+    sincronizar no se vuelve a insertar ni a descontar stock. Con el escritor
+    agrupado activo (ver escritor.py) la transacción se comparte con las
+    facturas de otras sesiones y esta llamada espera a que se confirme.
+    """
+    if not factura.detalles:
+        return False, "La factura no tiene productos"
+    if factura.id_factura is not None:
+        return False, f"La factura ya fue guardada (n.º {factura.id_factura})"
+    clave = uuid.uuid4().hex
+    agrupado = _escritor_agrupado()
+    try:
+        if agrupado is not None:
+            id_factura = agrupado.enviar(factura, clave).result()
+        else:
+            id_factura, = run_transaction(lambda cur: write_invoices(cur, [factura], claves=[clave]))
+    except Error as e:
+        if es_sin_conexion(e):
+            import cola_offline
+            cola_offline.encolar_factura(factura, clave)
+            return True, MSG_EN_COLA
+        return False, str(e)
+    factura.id_factura = id_factura
+    return True, None
+
+
+def _escritor_agrupado():
+    """El escritor activo o None. escritor.py (y concurrent.futures) solo se
+    importa si EASYFACT_AGRUPAR_MS lo activa o si alguien ya lo activó."""
+    if "escritor" not in sys.modules and float(os.environ.get("EASYFACT_AGRUPAR_MS") or 0) <= 0:
+        return None
+    import escritor
+    return escritor.get_escritor()
+
+
+def insert_invoice_and_detail(id_cliente, id_producto, cantidad, precio):
+    factura = Factura(Cliente(None, None, id_cliente=id_cliente))
+    factura.agregar_producto(Producto(None, precio, id_producto=id_producto), cantidad)
+    return insert_invoice(factura)
+
+
+def fetch_invoices(filter_cliente=None, after=None, limit=None, id_clientes=None):
+    """Facturas de la más reciente a la más antigua.
+
+    Con limit se pagina por clave (fecha, id_factura): after es la clave de la
+    última fila de la página anterior, así cada página usa el índice en lugar
+    de saltar filas con OFFSET. id_clientes limita el resultado a esos clientes
+    (ver Catalogo.buscar_clientes; con muchos, ver db.filtro_ids). Cada
+    combinación de filtros es una sentencia preparada; con id_clientes no,
+    porque la lista IN cambia de largo.
+    """
+    if id_clientes is not None and not id_clientes:
+        return []
+    with conexion() as conn:
+        if not conn:
+            return []
+        sql = """SELECT f.id_factura, c.nombre, f.fecha, f.total
+                 FROM facturas f
+                 JOIN clientes c ON f.id_cliente = c.id_cliente"""
+        where, params = [], []
+        cur = None
+        if filter_cliente:
+            where.append("c.nombre LIKE %s")
+            params.append(f"%{filter_cliente}%")
+        if id_clientes:
+            cur = conn.cursor()
+            condicion, ids = filtro_ids(cur, "f.id_cliente", id_clientes)
+            where.append(condicion)
+            params += ids
+        if after:
+            where.append("(f.fecha < %s OR (f.fecha = %s AND f.id_factura < %s))")
+            params += [after[0], after[0], after[1]]
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY f.fecha DESC, f.id_factura DESC"
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        if not id_clientes:
+            forma = ("c" if filter_cliente else "") + ("a" if after else "") + ("l" if limit else "")
+            return consultar(conn, registrar_sentencia("facturas:" + forma, sql), params)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+
+def estimate_invoice_count():
+    """Cantidad aproximada de facturas según las estadísticas de la tabla (sin COUNT(*))."""
+    with conexion() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
+        cur.execute("""SELECT TABLE_ROWS FROM information_schema.TABLES
+                       WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'facturas'""")
+        row = cur.fetchone()
+        cur.close()
+        return row[0] if row else None
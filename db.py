@@ -1,14 +1,442 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
 
+from metricas import ConexionMedida, CursorMedido, get_metricas
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "Root",
+    "database": "facturacion_electronica",
+}
+
+POOL_SIZE = 5
+POOL_TIMEOUT = 10        # segundos esperando una conexión libre
+IDLE_TIMEOUT = 300       # conexiones ociosas más viejas que esto se cierran
+PING_INTERVAL = 5        # solo se hace ping si la conexión lleva más de esto sin usarse
+
+TX_RETRIES = 3
+TX_BACKOFF = 0.05        # segundos, se duplica en cada reintento
+RETRYABLE_ERRNOS = {1205, 1213}   # lock wait timeout, deadlock
+# no se pudo conectar / servidor caído / conexión perdida a mitad de la consulta
+OFFLINE_ERRNOS = {2003, 2005, 2006, 2013, 2055}
+
+# sentencias preparadas en el servidor (ver Sentencias); EASYFACT_PREPARADAS=0 usa el protocolo de texto
+PREPARADAS = os.environ.get("EASYFACT_PREPARADAS", "1") != "0"
+ERRNO_SENTENCIA_DESCONOCIDA = 1243   # el servidor ya no tiene el statement (se reconectó)
+ERRNO_DEMASIADAS_SENTENCIAS = 1461   # se alcanzó max_prepared_stmt_count
+
+SENTENCIAS = {}          # nombre -> SQL, ver registrar_sentencia()
+MAX_IN = 1000            # ids por encima de esto van por tabla temporal (ver filtro_ids)
+
+
+def registrar_sentencia(nombre, sql):
+    """Agrega sql al registro; cada conexión la prepara la primera vez que se ejecuta."""
+    SENTENCIAS[nombre] = sql
+    return nombre
+
+
+class Sentencias:
+    """Sentencias preparadas de una conexión del pool, una por nombre del registro.
+
+    Cada nombre tiene su cursor prepared=True: mientras se ejecute el mismo SQL
+    el conector reutiliza el statement del servidor y solo envía los
+    parámetros. Si el servidor ya no lo conoce se vuelve a preparar.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursores = {}
+        self.preparadas = 0
+
+    def _cursor(self, nombre, nuevo=False):
+        cur = None if nuevo else self._cursores.get(nombre)
+        if cur is None:
+            cur = self._cursores[nombre] = CursorMedido(self._conn.cursor(prepared=True))
+            self.preparadas += 1
+        return cur
+
+    def ejecutar(self, nombre, params):
+        sql = SENTENCIAS[nombre]
+        cur = self._cursor(nombre)
+        try:
+            cur.execute(sql, params)
+        except Error as e:
+            if getattr(e, "errno", None) != ERRNO_SENTENCIA_DESCONOCIDA:
+                raise
+            cur = self._cursor(nombre, nuevo=True)
+            cur.execute(sql, params)
+        return cur
+
+
+class PoolAgotado(Error):
+    """Tiempo agotado esperando una conexión libre: la base está saturada, no caída."""
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones MySQL reutilizables.
+
+    Las conexiones se entregan con acquire()/release() o con el context manager
+    connection(). Al entregar una conexión que lleva tiempo ociosa se verifica
+    que siga viva; las que superan idle_timeout se cierran.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, idle_timeout=IDLE_TIMEOUT,
+                 ping_interval=PING_INTERVAL, connect=None, **config):
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.config = config or dict(DB_CONFIG)
+        # connect(**config) crea cada conexión; se puede cambiar para apuntar a otra base (benchmarks)
+        self.connect = connect or mysql.connector.connect
+
+        self._idle = []          # [(conn, ultimo_uso)], la más reciente al final
+        self._sentencias = {}    # id(conn) -> Sentencias
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self.checkouts = 0
+        self.created = 0
+        self.evicted = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _new_connection(self):
+        conn = self.connect(**self.config)
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _alive(self, conn, last_used):
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            return conn.is_connected()
+        except Error:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self.evicted += 1
+            # los statements del servidor se liberan al cerrar la conexión
+            self._sentencias.pop(id(conn), None)
+        try:
+            conn.close()
+        except Error:
+            pass
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._cond:
+            stale = [c for c, t in self._idle if now - t > self.idle_timeout]
+            self._idle = [(c, t) for c, t in self._idle if now - t <= self.idle_timeout]
+        for conn in stale:
+            self._discard(conn)
+        return len(stale)
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        self.evict_idle()
+
+        with self._cond:
+            while not self._idle and self._in_use >= self.size:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolAgotado("Tiempo de espera agotado esperando una conexión del pool")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.checkouts += 1
+            self._in_use += 1
+            candidate = self._idle.pop() if self._idle else None
+
+        try:
+            if candidate is not None:
+                conn, last_used = candidate
+                if self._alive(conn, last_used):
+                    return conn
+                self._discard(conn)
+            return self._new_connection()
+        except Error:
+            with self._cond:
+                self.failed += 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, broken=False):
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Error:
+                broken = True
+        if broken:
+            self._discard(conn)
+        with self._cond:
+            self._in_use -= 1
+            if not broken:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except Error:
+            broken = not _is_connected(conn)
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def sentencias(self, conn):
+        with self._cond:
+            sentencias = self._sentencias.get(id(conn))
+            if sentencias is None:
+                sentencias = self._sentencias[id(conn)] = Sentencias(conn)
+            return sentencias
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._sentencias.pop(id(conn), None)
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Error:
+                pass
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._in_use
+            preparadas = sum(s.preparadas for s in self._sentencias.values())
+        return {
+            "size": self.size,
+            "idle": idle,
+            "in_use": in_use,
+            "checkouts": self.checkouts,
+            "created": self.created,
+            "evicted": self.evicted,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "wait_total": self.wait_total,
+            "wait_avg": self.wait_total / self.checkouts if self.checkouts else 0.0,
+            "wait_max": self.wait_max,
+            "preparadas": preparadas,
+        }
+
+
+def _is_connected(conn):
+    try:
+        return conn.is_connected()
+    except Error:
+        return False
+
+
+class PooledConnection:
+    """Envoltura devuelta por conectar(): close() devuelve la conexión al pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn, broken=not _is_connected(self._conn))
+            self._conn = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def configure_pool(**kwargs):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(**kwargs)
+    return _pool
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+@contextmanager
+def conexion():
+    """Context manager que presta una conexión del pool, o None si MySQL no está alcanzable.
+
+    Solo un error de conexión (OFFLINE_ERRNOS) da None y se trata como sin
+    conexión; el resto, como el tiempo agotado esperando un lugar en el pool
+    con la base saturada, se propaga: no hay que encolar facturas offline por eso.
+    """
+    pool = get_pool()
+    t = time.perf_counter()
+    try:
+        conn = pool.acquire()
+    except Error as e:
+        get_metricas().registrar_espera((time.perf_counter() - t) * 1000, error=True)
+        if not es_sin_conexion(e):
+            raise
+        print("Error:", e)
+        yield None
+        return
+    get_metricas().registrar_espera((time.perf_counter() - t) * 1000)
+    broken = False
+    medida = ConexionMedida(conn)
+    medida.sentencias = pool.sentencias(conn)
+    try:
+        yield medida
+    except Error:
+        broken = not _is_connected(conn)
+        raise
+    finally:
+        pool.release(conn, broken)
+
+
+class SinConexion(Error):
+    pass
+
+
+def es_sin_conexion(e):
+    """True si el error se debe a que MySQL no está alcanzable (no a los datos)."""
+    return isinstance(e, SinConexion) or getattr(e, "errno", None) in OFFLINE_ERRNOS
+
+
+tx_stats = {"commits": 0, "retries": 0, "failures": 0}
+
+
+def transaccion(conn, fn, retries=TX_RETRIES):
+    """Ejecuta fn(cur) y hace commit; si MySQL aborta por deadlock o espera de lock, reintenta."""
+    intento = 0
+    while True:
+        cur = conn.cursor()
+        cur.sentencias = getattr(conn, "sentencias", None)
+        try:
+            result = fn(cur)
+            conn.commit()
+            tx_stats["commits"] += 1
+            return result
+        except Error as e:
+            try:
+                conn.rollback()
+            except Error:
+                pass
+            if getattr(e, "errno", None) in RETRYABLE_ERRNOS and intento < retries:
+                intento += 1
+                tx_stats["retries"] += 1
+                time.sleep(TX_BACKOFF * 2 ** (intento - 1))
+                continue
+            tx_stats["failures"] += 1
+            raise
+        finally:
+            cur.close()
+
+
+def run_transaction(fn, retries=TX_RETRIES):
+    with conexion() as conn:
+        if not conn:
+            raise SinConexion("No hay conexión")
+        return transaccion(conn, fn, retries)
+
+
 def conectar():
+    pool = get_pool()
+    t = time.perf_counter()
     try:
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="Root",
-            database="facturacion_electronica"
-        )
+        conn = pool.acquire()
     except Error as e:
+        get_metricas().registrar_espera((time.perf_counter() - t) * 1000, error=True)
         print("Error:", e)
         return None
+    get_metricas().registrar_espera((time.perf_counter() - t) * 1000)
+    return PooledConnection(pool, conn)
+
+
+def _sentencias(conn_o_cur):
+    if not PREPARADAS:
+        return None
+    return getattr(conn_o_cur, "sentencias", None)
+
+
+def ejecutar(cur, nombre, params=()):
+    """Ejecuta la sentencia registrada nombre y devuelve el cursor usado (lastrowid, rowcount).
+
+    Va preparada si la conexión del cursor viene del pool y PREPARADAS está
+    activo; si no, o si el servidor no admite más statements, se ejecuta como
+    texto en cur.
+    """
+    sentencias = _sentencias(cur)
+    if sentencias is not None:
+        try:
+            return sentencias.ejecutar(nombre, params)
+        except Error as e:
+            if getattr(e, "errno", None) != ERRNO_DEMASIADAS_SENTENCIAS:
+                raise
+    cur.execute(SENTENCIAS[nombre], params)
+    return cur
+
+
+def consultar(conn, nombre, params=()):
+    """Filas de la sentencia registrada nombre (ver ejecutar)."""
+    sentencias = _sentencias(conn)
+    if sentencias is not None:
+        try:
+            return sentencias.ejecutar(nombre, params).fetchall()
+        except Error as e:
+            if getattr(e, "errno", None) != ERRNO_DEMASIADAS_SENTENCIAS:
+                raise
+    cur = conn.cursor()
+    cur.execute(SENTENCIAS[nombre], params)
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+def filtro_ids(cur, columna, ids):
+    """(condición, params) para columna IN ids.
+
+    Hasta MAX_IN ids va como lista de parámetros; con más (p. ej. una búsqueda
+    de cliente que coincide con miles de nombres) los ids se cargan en una
+    tabla temporal de la conexión y la condición es una subconsulta, para no
+    mandar ni hacer analizar al servidor una sentencia de cientos de KB.
+    """
+    ids = sorted(set(ids))
+    if len(ids) <= MAX_IN:
+        return f"{columna} IN (" + ", ".join(["%s"] * len(ids)) + ")", ids
+    cur.execute("CREATE TEMPORARY TABLE IF NOT EXISTS filtro_ids (id INT PRIMARY KEY)")
+    cur.execute("DELETE FROM filtro_ids")       # la conexión vuelve al pool con la tabla
+    for i in range(0, len(ids), MAX_IN):
+        cur.executemany("INSERT INTO filtro_ids (id) VALUES (%s)", [(x,) for x in ids[i:i + MAX_IN]])
+    return f"{columna} IN (SELECT id FROM filtro_ids)", []
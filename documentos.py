@@ -0,0 +1,135 @@
+"""Generación de la factura electrónica (XML) y su representación imprimible (PDF).
+
+    python documentos.py salida/ 101 102 103            # facturas puntuales
+    python documentos.py salida/ --desde 2026-10-01     # todas las del rango
+    python documentos.py salida/ --desde 2026-10-01 --procesos 8
+
+Los datos se leen de la base en bloques desde el proceso principal; el
+renderizado y la escritura (atómica: archivo temporal + rename) se reparten en
+un pool de procesos, cada uno con sus plantillas ya compiladas.
+"""
+import os
+import sys
+import time
+
+from mysql.connector import Error
+
+from db import conexion
+from app.documentos.render import renderizar_a_disco, renderizar_bloque
+
+BLOQUE = 500
+
+
+def cargar_documentos(ids):
+    """Datos de render de las facturas ids, en el mismo orden, con una sola consulta."""
+    if not ids:
+        return []
+    with conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        cur = conn.cursor()
+        marcadores = ", ".join(["%s"] * len(ids))
+        cur.execute(f"""SELECT f.id_factura, f.fecha, f.total, c.id_cliente, c.nombre, c.documento,
+                               df.id_producto, p.nombre, df.cantidad, df.precio
+                        FROM facturas f
+                        JOIN clientes c ON c.id_cliente = f.id_cliente
+                        JOIN detalle_factura df ON df.id_factura = f.id_factura
+                        JOIN productos p ON p.id_producto = df.id_producto
+                        WHERE f.id_factura IN ({marcadores})
+                        ORDER BY f.id_factura, df.id_detalle""", list(ids))
+        rows = cur.fetchall()
+        cur.close()
+
+    docs = {}
+    for (id_factura, fecha, total, id_cliente, nombre, documento,
+         id_producto, producto, cantidad, precio) in rows:
+        doc = docs.get(id_factura)
+        if doc is None:
+            doc = docs[id_factura] = {
+                "id_factura": id_factura, "fecha": str(fecha), "total": str(total),
+                "cliente": {"id_cliente": id_cliente, "nombre": nombre, "documento": documento},
+                "lineas": [],
+            }
+        doc["lineas"].append({"id_producto": id_producto, "producto": producto, "cantidad": cantidad,
+                              "precio": str(precio), "subtotal": str(precio * cantidad)})
+    return [docs[i] for i in ids if i in docs]
+
+
+def ids_en_rango(desde=None, hasta=None):
+    with conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        cur = conn.cursor()
+        where, params = [], []
+        if desde:
+            where.append("fecha >= %s")
+            params.append(desde)
+        if hasta:
+            where.append("fecha <= %s")
+            params.append(hasta)
+        sql = "SELECT id_factura FROM facturas"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        cur.execute(sql + " ORDER BY id_factura", params)
+        ids = [r[0] for r in cur.fetchall()]
+        cur.close()
+    return ids
+
+
+def generar_documento(id_factura, carpeta):
+    """Genera el XML y el PDF de una factura recién guardada."""
+    os.makedirs(carpeta, exist_ok=True)
+    docs = cargar_documentos([id_factura])
+    if not docs:
+        raise Error(f"La factura {id_factura} no existe")
+    return renderizar_a_disco(docs[0], carpeta)
+
+
+def generar_lote(ids, carpeta, procesos=None, progreso=None):
+    """Genera los documentos de ids leyendo la base de a BLOQUE facturas."""
+    from concurrent.futures import ProcessPoolExecutor
+    os.makedirs(carpeta, exist_ok=True)
+    procesos = procesos or os.cpu_count() or 1
+    hechos = 0
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        pendientes = []
+        for i in range(0, len(ids), BLOQUE):
+            docs = cargar_documentos(ids[i:i + BLOQUE])
+            partes = [docs[j:j + 50] for j in range(0, len(docs), 50)]
+            pendientes += [pool.submit(renderizar_bloque, p, carpeta) for p in partes]
+            # no dejar que la lectura se adelante demasiado al renderizado
+            while len(pendientes) > 4 * procesos:
+                hechos += pendientes.pop(0).result()
+                if progreso:
+                    progreso(hechos, len(ids))
+        for f in pendientes:
+            hechos += f.result()
+            if progreso:
+                progreso(hechos, len(ids))
+    return hechos
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Genera XML y PDF de facturas")
+    parser.add_argument("carpeta")
+    parser.add_argument("ids", nargs="*", type=int)
+    parser.add_argument("--desde")
+    parser.add_argument("--hasta")
+    parser.add_argument("--procesos", type=int, help="por defecto, uno por núcleo")
+    args = parser.parse_args(argv)
+
+    try:
+        ids = args.ids or ids_en_rango(args.desde, args.hasta)
+        t = time.perf_counter()
+        hechos = generar_lote(ids, args.carpeta, args.procesos)
+    except Error as e:
+        print("Error:", e)
+        return 1
+    segundos = time.perf_counter() - t
+    print(f"{hechos} facturas en {segundos:.2f} s ({hechos / segundos if segundos else 0:.0f} docs/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+DB_WORKERS = 4
+POLL_MS = 30
+
+
+class DBExecutor:
+    """Ejecuta funciones de base de datos en hilos y entrega el resultado al hilo de Tk.
+
+    Los callbacks nunca corren en el hilo trabajador: los resultados se dejan en
+    una cola que se vacía con root.after(). Cada tarea puede tener un dueño
+    (normalmente una pantalla); cancel(owner) descarta sus tareas pendientes y
+    los resultados que lleguen después, salvo las enviadas con cancelable=False
+    (escrituras, exportaciones), cuyo callback siempre se entrega.
+    """
+
+    def __init__(self, root, workers=DB_WORKERS, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._tasks = {}          # owner -> set de futures
+        self._cancelled = set()   # futures cuyo resultado se descarta
+        self._fijas = set()       # futures que cancel() no toca
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._poll()
+
+    def submit(self, fn, *args, callback=None, errback=None, owner=None, cancelable=True, **kwargs):
+        future = self._pool.submit(fn, *args, **kwargs)
+        self.submitted += 1
+        with self._lock:
+            self._tasks.setdefault(owner, set()).add(future)
+            if not cancelable:
+                self._fijas.add(future)
+        self._notify_busy(owner)
+        future.add_done_callback(
+            lambda f: self._results.put((f, owner, callback, errback)))
+        return future
+
+    def cancel(self, owner):
+        with self._lock:
+            futures = self._tasks.pop(owner, set())
+            fijas = futures & self._fijas
+            if fijas:
+                self._tasks[owner] = fijas
+                futures -= fijas
+            for f in futures:
+                if not f.cancel():
+                    self._cancelled.add(f)
+        self.cancelled += len(futures)
+        self._notify_busy(owner)
+
+    def pending(self, owner):
+        with self._lock:
+            return len(self._tasks.get(owner, ()))
+
+    def _notify_busy(self, owner):
+        set_busy = getattr(owner, "set_busy", None)
+        if set_busy:
+            set_busy(self.pending(owner) > 0)
+
+    def _poll(self):
+        # el siguiente _poll se agenda siempre: si se cortara, ningún resultado
+        # llegaría más a la interfaz y las pantallas quedarían ocupadas
+        try:
+            while True:
+                try:
+                    future, owner, callback, errback = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                with self._lock:
+                    self._fijas.discard(future)
+                    if future in self._cancelled:
+                        self._cancelled.discard(future)
+                        continue
+                    if future.cancelled():
+                        continue
+                    self._tasks.get(owner, set()).discard(future)
+                self.completed += 1
+                self._notify_busy(owner)
+                try:
+                    result = future.result()
+                except CancelledError:
+                    continue
+                except Exception as e:
+                    if errback:
+                        self._entregar(errback, e)
+                    continue
+                if callback:
+                    self._entregar(callback, result)
+        finally:
+            if not self._closed:
+                self.root.after(self.poll_ms, self._poll)
+
+    def _entregar(self, fn, valor):
+        """Llama al callback; si falla se informa como cualquier error de Tk y se sigue."""
+        try:
+            fn(valor)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
+
+    def shutdown(self):
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,184 @@
+"""Escritura agrupada de facturas (group commit).
+
+Con muchas cajas a la vez, cada factura en su propia transacción hace que la
+base pase casi todo el tiempo en el fsync de commits chicos. Con el escritor
+activo, insert_invoice no escribe: deja la factura en una cola y espera su
+Future. Un hilo junta lo que llega durante AGRUPAR_MS (o hasta AGRUPAR_MAX
+facturas, lo que pase primero) y lo guarda en una sola transacción.
+
+Cada factura va dentro de su SAVEPOINT: si una falla (p. ej. stock
+insuficiente) se deshace solo esa y su llamador recibe el error; las demás
+del lote se confirman igual. Un deadlock o una caída de la conexión sí
+afectan a todo el lote: se reintenta entero (db.transaccion) o todos reciben
+el error de conexión y terminan en la cola offline con su clave de
+idempotencia, como sin el escritor.
+
+Está apagado por defecto; se activa con activar() (api.py --agrupar-ms) o
+con EASYFACT_AGRUPAR_MS.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from mysql.connector import Error
+
+import resumenes
+from db import RETRYABLE_ERRNOS, es_sin_conexion, run_transaction
+from metricas import Histograma
+
+AGRUPAR_MS = float(os.environ.get("EASYFACT_AGRUPAR_MS", 0))
+AGRUPAR_MAX = int(os.environ.get("EASYFACT_AGRUPAR_MAX", 50))
+
+
+class EscritorAgrupado:
+    def __init__(self, ms=AGRUPAR_MS or 5, maximo=AGRUPAR_MAX):
+        self.ms = ms
+        self.maximo = maximo
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self.reiniciar()
+        self._hilo = threading.Thread(target=self._correr, name="escritor-facturas", daemon=True)
+        self._hilo.start()
+
+    def reiniciar(self):
+        with self._lock:
+            self.lotes = 0
+            self.facturas = 0
+            self.rechazadas = 0
+            self.fallidos = 0
+            self.tamano_max = 0
+            self.espera = Histograma()      # ms desde que se encola hasta que empieza su lote
+            self.escritura = Histograma()   # ms de la transacción de cada lote
+            self.desde = time.time()
+
+    def enviar(self, factura, clave=None):
+        """Encola la factura; el Future se resuelve con su id_factura o con el error.
+
+        clave (ver datos.insert_invoice) se guarda en operaciones_aplicadas con la factura.
+        """
+        futuro = Future()
+        self._cola.put((factura, clave, futuro, time.perf_counter()))
+        return futuro
+
+    def detener(self, timeout=10):
+        """Escribe lo que quedó en la cola y termina el hilo."""
+        self._cola.put(None)
+        self._hilo.join(timeout)
+
+    def _correr(self):
+        seguir = True
+        while seguir:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            lote = [primero]
+            limite = time.monotonic() + self.ms / 1000
+            while len(lote) < self.maximo:
+                resto = limite - time.monotonic()
+                try:
+                    item = self._cola.get(timeout=resto) if resto > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    seguir = False
+                    break
+                lote.append(item)
+            self._escribir(lote)
+
+    def _escribir(self, lote):
+        from datos import asegurar_aplicadas, write_invoices
+        inicio = time.perf_counter()
+        lote = [item for item in lote if item[2].set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        def escribir(cur):
+            # DDL antes del primer SAVEPOINT: hace commit implícito
+            resumenes.asegurar_tablas(cur)
+            asegurar_aplicadas(cur)
+            resultados = []
+            for i, (factura, clave, _, _) in enumerate(lote):
+                cur.execute(f"SAVEPOINT f{i}")
+                try:
+                    claves = None if clave is None else [clave]
+                    id_factura, = write_invoices(cur, [factura], claves=claves)
+                except Error as e:
+                    # deadlock o conexión caída: MySQL ya deshizo todo, se reintenta el lote
+                    if es_sin_conexion(e) or getattr(e, "errno", None) in RETRYABLE_ERRNOS:
+                        raise
+                    cur.execute(f"ROLLBACK TO SAVEPOINT f{i}")
+                    resultados.append(e)
+                else:
+                    cur.execute(f"RELEASE SAVEPOINT f{i}")
+                    resultados.append(id_factura)
+            return resultados
+
+        try:
+            resultados = run_transaction(escribir)
+        except Exception as e:
+            resultados = [e] * len(lote)
+            with self._lock:
+                self.fallidos += 1
+        fin = time.perf_counter()
+        with self._lock:
+            self.lotes += 1
+            self.facturas += len(lote)
+            self.tamano_max = max(self.tamano_max, len(lote))
+            self.escritura.agregar((fin - inicio) * 1000)
+            for _, _, _, t in lote:
+                self.espera.agregar((inicio - t) * 1000)
+        for (_, _, futuro, _), resultado in zip(lote, resultados):
+            if isinstance(resultado, Exception):
+                if isinstance(resultado, Error) and not es_sin_conexion(resultado):
+                    with self._lock:
+                        self.rechazadas += 1
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+
+    def stats(self):
+        with self._lock:
+            segundos = max(time.time() - self.desde, 1e-9)
+            return {
+                "ms": self.ms,
+                "maximo": self.maximo,
+                "en_cola": self._cola.qsize(),
+                "lotes": self.lotes,
+                "facturas": self.facturas,
+                "rechazadas": self.rechazadas,
+                "lotes_fallidos": self.fallidos,
+                "tamano_promedio": self.facturas / self.lotes if self.lotes else 0.0,
+                "tamano_max": self.tamano_max,
+                "commits_por_s": self.lotes / segundos,
+                "espera": self.espera.resumen(),
+                "escritura": self.escritura.resumen(),
+            }
+
+
+_escritor = None
+_escritor_lock = threading.Lock()
+
+
+def activar(ms=None, maximo=None):
+    global _escritor
+    with _escritor_lock:
+        if _escritor is None:
+            _escritor = EscritorAgrupado(ms or AGRUPAR_MS or 5, maximo or AGRUPAR_MAX)
+    return _escritor
+
+
+def detener():
+    global _escritor
+    with _escritor_lock:
+        escritor, _escritor = _escritor, None
+    if escritor is not None:
+        escritor.detener()
+
+
+def get_escritor():
+    """El escritor activo, o None si cada factura hace su propio commit."""
+    if _escritor is None and AGRUPAR_MS > 0:
+        return activar()
+    return _escritor
@@ -0,0 +1,168 @@
+"""Exportación de facturas con sus líneas a CSV o JSONL, en streaming.
+
+    python exportar.py facturas.csv
+    python exportar.py facturas.jsonl.gz --desde 2026-01-01 --hasta 2026-06-30 --cliente 42
+
+Las filas se leen con un cursor sin buffer (el servidor las va enviando) en
+bloques de fetchmany y se escriben a medida que llegan, así que la memoria no
+depende de cuántas facturas haya. En CSV va una fila por línea de factura; en
+JSONL un objeto por factura con sus líneas. Un sufijo .gz comprime la salida.
+"""
+import csv
+import gzip
+import json
+import os
+import sys
+
+from mysql.connector import Error
+
+from db import conexion, filtro_ids
+
+FETCH_SIZE = 2000
+PROGRESS_EVERY = 1000
+
+COLUMNAS = ["id_factura", "fecha", "id_cliente", "cliente", "total",
+            "id_producto", "producto", "cantidad", "precio"]
+
+
+def _consulta(conn, desde, hasta, id_clientes):
+    sql = """SELECT f.id_factura, f.fecha, f.id_cliente, c.nombre, f.total,
+                    df.id_producto, p.nombre, df.cantidad, df.precio
+             FROM facturas f
+             JOIN clientes c ON c.id_cliente = f.id_cliente
+             JOIN detalle_factura df ON df.id_factura = f.id_factura
+             JOIN productos p ON p.id_producto = df.id_producto"""
+    where, params = [], []
+    if desde:
+        where.append("f.fecha >= %s")
+        params.append(desde)
+    if hasta:
+        where.append("f.fecha <= %s")
+        params.append(hasta)
+    if id_clientes:
+        cur = conn.cursor()
+        condicion, ids = filtro_ids(cur, "f.id_cliente", id_clientes)
+        cur.close()
+        where.append(condicion)
+        params += ids
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY f.id_factura", params
+
+
+def _abrir(ruta, comprimir):
+    if comprimir:
+        return gzip.open(ruta, "wt", newline="", encoding="utf-8")
+    return open(ruta, "w", newline="", encoding="utf-8")
+
+
+class _EscritorCSV:
+    def __init__(self, f):
+        self.w = csv.writer(f)
+        self.w.writerow(COLUMNAS)
+
+    def linea(self, row):
+        self.w.writerow(row)
+
+    def cerrar_factura(self):
+        pass
+
+
+class _EscritorJSONL:
+    def __init__(self, f):
+        self.f = f
+        self.actual = None
+
+    def linea(self, row):
+        if self.actual is None:
+            self.actual = {"id_factura": row[0], "fecha": str(row[1]), "id_cliente": row[2],
+                           "cliente": row[3], "total": str(row[4]), "lineas": []}
+        self.actual["lineas"].append({"id_producto": row[5], "producto": row[6],
+                                      "cantidad": row[7], "precio": str(row[8])})
+
+    def cerrar_factura(self):
+        if self.actual is not None:
+            self.f.write(json.dumps(self.actual, ensure_ascii=False) + "\n")
+            self.actual = None
+
+
+def exportar_facturas(ruta, formato=None, desde=None, hasta=None, id_clientes=None,
+                      comprimir=None, progreso=None):
+    """Escribe las facturas filtradas en ruta. Devuelve (facturas, lineas).
+
+    progreso(facturas, lineas) se llama cada PROGRESS_EVERY facturas, desde el
+    hilo que exporta.
+    """
+    base = ruta[:-3] if ruta.endswith(".gz") else ruta
+    formato = formato or ("jsonl" if base.endswith((".jsonl", ".json")) else "csv")
+    comprimir = ruta.endswith(".gz") if comprimir is None else comprimir
+    tmp = ruta + ".part"
+
+    facturas = lineas = 0
+    with conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        sql, params = _consulta(conn, desde, hasta, id_clientes)
+        cur = conn.cursor(buffered=False)
+        try:
+            with _abrir(tmp, comprimir) as f:
+                escritor = _EscritorCSV(f) if formato == "csv" else _EscritorJSONL(f)
+                cur.execute(sql, params)
+                actual = None
+                while True:
+                    rows = cur.fetchmany(FETCH_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        if row[0] != actual:
+                            if actual is not None:
+                                escritor.cerrar_factura()
+                                facturas += 1
+                                if progreso and facturas % PROGRESS_EVERY == 0:
+                                    progreso(facturas, lineas)
+                            actual = row[0]
+                        escritor.linea(row)
+                        lineas += 1
+                if actual is not None:
+                    escritor.cerrar_factura()
+                    facturas += 1
+            os.replace(tmp, ruta)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            try:
+                cur.close()
+            except Error:
+                # cursor cortado a la mitad: se descarta lo que quede por leer
+                conn.consume_results()
+    if progreso:
+        progreso(facturas, lineas)
+    return facturas, lineas
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Exporta facturas a CSV o JSONL")
+    parser.add_argument("salida", help="archivo de salida (.csv, .jsonl, opcionalmente .gz)")
+    parser.add_argument("--formato", choices=["csv", "jsonl"])
+    parser.add_argument("--desde", help="fecha inicial AAAA-MM-DD")
+    parser.add_argument("--hasta", help="fecha final AAAA-MM-DD")
+    parser.add_argument("--cliente", type=int, action="append", help="id_cliente (repetible)")
+    parser.add_argument("--gzip", action="store_true", default=None)
+    args = parser.parse_args(argv)
+
+    def progreso(facturas, lineas):
+        print(f"\r{facturas} facturas, {lineas} líneas", end="", file=sys.stderr)
+
+    try:
+        facturas, lineas = exportar_facturas(args.salida, args.formato, args.desde, args.hasta,
+                                             args.cliente, args.gzip, progreso)
+    except Error as e:
+        print("Error:", e)
+        return 1
+    print(f"\n{facturas} facturas exportadas a {args.salida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
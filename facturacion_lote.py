@@ -0,0 +1,238 @@
+"""Facturación masiva (cierre de mes, suscripciones).
+
+    python facturacion_lote.py plan.csv --lote 2026-10
+    python facturacion_lote.py plan.csv --lote 2026-10 --chunk 1000
+
+El plan es un CSV con columnas id_cliente, id_producto, cantidad; las líneas
+consecutivas del mismo cliente forman una factura. Las facturas se guardan en
+transacciones de --chunk facturas. La posición alcanzada en el plan se guarda en
+lotes_facturacion dentro de la misma transacción, así que si el proceso se cae
+basta volver a correr el mismo comando con el mismo --lote para continuar sin
+duplicar facturas. Si una factura del bloque no se puede guardar (p. ej. stock
+insuficiente) el bloque se rehace de a una factura, cada una en su SAVEPOINT:
+esa queda rechazada con su posición en el plan y las demás se guardan.
+"""
+import csv
+import sys
+import time
+
+from mysql.connector import Error
+
+import resumenes
+from db import RETRYABLE_ERRNOS, conexion, es_sin_conexion, transaccion
+from catalogo import get_catalogo
+from datos import write_invoices
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.facturas.factura import Factura
+
+CHUNK_SIZE = 500
+
+DDL_LOTES = """CREATE TABLE IF NOT EXISTS lotes_facturacion (
+    id_lote VARCHAR(64) PRIMARY KEY,
+    posicion INT NOT NULL,
+    actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)"""
+
+
+def leer_plan(ruta):
+    """Genera (id_cliente, [(id_producto, cantidad), ...]) agrupando filas consecutivas.
+
+    Una fila sin números enteros corta el plan con ValueError (con su número de
+    línea); las cantidades de cero o menos se rechazan factura por factura en
+    armar_factura.
+    """
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        actual, lineas = None, []
+        lector = csv.DictReader(f)
+        for row in lector:
+            try:
+                id_cliente = int(row["id_cliente"])
+                linea = (int(row["id_producto"]), int(row["cantidad"]))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"{ruta}, línea {lector.line_num}: se esperan enteros en "
+                                 f"id_cliente, id_producto y cantidad")
+            if actual is not None and id_cliente != actual:
+                yield actual, lineas
+                lineas = []
+            actual = id_cliente
+            lineas.append(linea)
+        if actual is not None:
+            yield actual, lineas
+
+
+def armar_factura(id_cliente, lineas, catalogo):
+    factura = Factura(Cliente(None, None, id_cliente=id_cliente))
+    for id_producto, cantidad in lineas:
+        if cantidad <= 0:
+            return None, f"cantidad inválida ({cantidad}) para el producto {id_producto}"
+        row = catalogo.producto_por_id(id_producto)
+        if row is None:
+            return None, f"producto {id_producto} no existe"
+        factura.agregar_producto(Producto(row[1], row[2], id_producto=row[0]), cantidad)
+    return factura, None
+
+
+def leer_checkpoint(cur, id_lote):
+    cur.execute("SELECT posicion FROM lotes_facturacion WHERE id_lote = %s", (id_lote,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def _guardar_checkpoint(cur, id_lote, posicion):
+    cur.execute("""INSERT INTO lotes_facturacion (id_lote, posicion) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE posicion = VALUES(posicion)""", (id_lote, posicion))
+
+
+def _es_de_la_factura(e):
+    """False si el error afecta a toda la transacción (deadlock, conexión caída)."""
+    return not (es_sin_conexion(e) or getattr(e, "errno", None) in RETRYABLE_ERRNOS)
+
+
+def escribir_bloque(cur, bloque, descontar_stock=True):
+    """Guarda las facturas de bloque [(posicion, id_cliente, factura)]; devuelve las rechazadas
+    como [(posicion, id_cliente, error)].
+
+    Primero intenta el bloque entero (un solo executemany de líneas); si falla
+    por una factura, lo rehace de a una con un SAVEPOINT por factura, como
+    escritor.py. No hace commit.
+    """
+    # DDL antes del primer SAVEPOINT: hace commit implícito
+    resumenes.asegurar_tablas(cur)
+    cur.execute("SAVEPOINT bloque")
+    try:
+        write_invoices(cur, [f for _, _, f in bloque], descontar_stock)
+        return []
+    except Error as e:
+        if not _es_de_la_factura(e):
+            raise
+        cur.execute("ROLLBACK TO SAVEPOINT bloque")
+    rechazadas = []
+    for i, (posicion, id_cliente, factura) in enumerate(bloque):
+        cur.execute(f"SAVEPOINT f{i}")
+        try:
+            write_invoices(cur, [factura], descontar_stock)
+        except Error as e:
+            if not _es_de_la_factura(e):
+                raise
+            cur.execute(f"ROLLBACK TO SAVEPOINT f{i}")
+            rechazadas.append((posicion, id_cliente, str(e)))
+        else:
+            cur.execute(f"RELEASE SAVEPOINT f{i}")
+    return rechazadas
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def facturar_lote(plan, id_lote, chunk_size=CHUNK_SIZE, progreso=None, descontar_stock=True):
+    """Factura cada entrada del plan en bloques de chunk_size facturas por transacción.
+
+    Las facturas que no se pueden guardar (stock insuficiente, cliente
+    inexistente) quedan en stats["errores"] con su posición y el lote sigue;
+    el checkpoint las deja atrás, así que reanudar no las vuelve a intentar.
+    """
+    catalogo = get_catalogo()
+    stats = {"facturas": 0, "lineas": 0, "omitidas": 0, "rechazadas": 0,
+             "bloques": 0, "errores": [], "latencias": []}
+    inicio = time.perf_counter()
+
+    with conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        cur = conn.cursor()
+        try:
+            cur.execute(DDL_LOTES)
+            desde = leer_checkpoint(cur, id_lote)
+            conn.commit()
+
+            bloque, posicion, guardado = [], desde, [desde]
+
+            def escribir(cur_tx):
+                rechazadas = escribir_bloque(cur_tx, bloque, descontar_stock)
+                _guardar_checkpoint(cur_tx, id_lote, posicion)
+                return rechazadas
+
+            def cerrar_bloque():
+                t = time.perf_counter()
+                rechazadas = transaccion(conn, escribir)
+                guardado[0] = posicion
+                stats["latencias"].append(time.perf_counter() - t)
+                stats["bloques"] += 1
+                fallidas = {r[0] for r in rechazadas}
+                guardadas = [f for pos, _, f in bloque if pos not in fallidas]
+                stats["facturas"] += len(guardadas)
+                stats["lineas"] += sum(len(f.detalles) for f in guardadas)
+                stats["rechazadas"] += len(rechazadas)
+                stats["errores"] += rechazadas
+                if progreso:
+                    progreso(stats)
+
+            for posicion, (id_cliente, lineas) in enumerate(plan, 1):
+                if posicion <= desde:
+                    stats["omitidas"] += 1
+                    continue
+                factura, err = armar_factura(id_cliente, lineas, catalogo)
+                if err:
+                    stats["rechazadas"] += 1
+                    stats["errores"].append((posicion, id_cliente, err))
+                    continue
+                bloque.append((posicion, id_cliente, factura))
+                if len(bloque) >= chunk_size:
+                    cerrar_bloque()
+                    bloque = []
+            if posicion > guardado[0]:
+                cerrar_bloque()
+        except Error:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    segundos = time.perf_counter() - inicio
+    lat = stats.pop("latencias")
+    stats.update({
+        "segundos": segundos,
+        "facturas_por_segundo": stats["facturas"] / segundos if segundos else 0.0,
+        "bloque_p50": _percentil(lat, 0.50),
+        "bloque_p95": _percentil(lat, 0.95),
+        "bloque_max": max(lat, default=0.0),
+    })
+    return stats
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Facturación masiva a partir de un plan CSV")
+    parser.add_argument("plan")
+    parser.add_argument("--lote", required=True, help="identificador del lote, para reanudar")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="facturas por transacción")
+    parser.add_argument("--sin-stock", action="store_true",
+                        help="no descontar stock (servicios y suscripciones)")
+    args = parser.parse_args(argv)
+
+    def progreso(stats):
+        print(f"  bloque {stats['bloques']}: {stats['facturas']} facturas")
+
+    try:
+        stats = facturar_lote(leer_plan(args.plan), args.lote, args.chunk, progreso,
+                              descontar_stock=not args.sin_stock)
+    except (Error, ValueError) as e:
+        print("Error:", e)
+        return 1
+
+    for posicion, id_cliente, err in sorted(stats["errores"]):
+        print(f"  rechazada #{posicion} (cliente {id_cliente}): {err}")
+    print(f"{stats['facturas']} facturas, {stats['lineas']} líneas en {stats['bloques']} bloques; "
+          f"{stats['omitidas']} ya hechas, {stats['rechazadas']} rechazadas")
+    print(f"{stats['facturas_por_segundo']:.0f} facturas/s, bloque p50 {stats['bloque_p50'] * 1000:.1f} ms, "
+          f"p95 {stats['bloque_p95'] * 1000:.1f} ms, máx {stats['bloque_max'] * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
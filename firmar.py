@@ -0,0 +1,181 @@
+"""CUFE (hash SHA-384 del contenido canónico) y firma de las facturas.
+
+    python firmar.py --generar-clave                  # una vez: crea claves/firma.key y las columnas
+    python firmar.py                                  # firma todas las facturas sin CUFE
+    python firmar.py 101 102                          # facturas puntuales
+    python firmar.py --desde 2026-10-01 --todas --procesos 8
+
+El hash y la firma se calculan en un pool de procesos; cada worker carga la
+clave una sola vez al arrancar. Los resultados se guardan en facturas.cufe y
+facturas.firma, un executemany por bloque.
+
+Las columnas cufe y firma las agrega este comando (ALTER TABLE), nunca el
+guardado de una factura: la interfaz solo firma al guardar si hay clave, y
+la clave se crea con --generar-clave, que también prepara las columnas.
+"""
+import os
+import sys
+import threading
+import time
+
+from mysql.connector import Error
+
+from db import conexion, run_transaction
+from documentos import BLOQUE, cargar_documentos
+from app.documentos import firma
+
+COLUMNAS = {
+    "cufe": "ALTER TABLE facturas ADD COLUMN cufe CHAR(96) NULL, ADD INDEX (cufe)",
+    "firma": "ALTER TABLE facturas ADD COLUMN firma VARCHAR(160) NULL",
+}
+SQL_GUARDAR = "UPDATE facturas SET cufe = %s, firma = %s WHERE id_factura = %s"
+
+_columnas_listas = False
+_columnas_lock = threading.Lock()
+
+
+def asegurar_columnas(cur):
+    """Agrega cufe y firma a facturas si faltan, una vez por proceso.
+
+    ALTER TABLE hace commit implícito: llamarla antes de cualquier cambio.
+    """
+    global _columnas_listas
+    if _columnas_listas:
+        return
+    with _columnas_lock:
+        if _columnas_listas:
+            return
+        cur.execute("""SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                       WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'facturas'""")
+        existentes = {r[0].lower() for r in cur.fetchall()}
+        for columna, ddl in COLUMNAS.items():
+            if columna not in existentes:
+                cur.execute(ddl)
+        _columnas_listas = True
+
+
+def preparar_esquema():
+    with conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        cur = conn.cursor()
+        asegurar_columnas(cur)
+        cur.close()
+
+
+def guardar_firmas(filas):
+    def guardar(cur):
+        cur.executemany(SQL_GUARDAR, filas)
+    if filas:
+        run_transaction(guardar)
+
+
+def firmar_facturas(ids):
+    """Firma pocas facturas en este mismo proceso; devuelve las filas (cufe, firma, id_factura)."""
+    filas = firma.sellar_bloque(cargar_documentos(ids))
+    guardar_firmas(filas)
+    return filas
+
+
+def firmar_factura(id_factura):
+    """Firma una factura recién guardada; devuelve el CUFE."""
+    filas = firmar_facturas([id_factura])
+    if not filas:
+        raise Error(f"La factura {id_factura} no existe")
+    return filas[0][0]
+
+
+def ids_a_firmar(desde=None, hasta=None, todas=False):
+    with conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        cur = conn.cursor()
+        where, params = [], []
+        if not todas:
+            where.append("cufe IS NULL")
+        if desde:
+            where.append("fecha >= %s")
+            params.append(desde)
+        if hasta:
+            where.append("fecha <= %s")
+            params.append(hasta)
+        sql = "SELECT id_factura FROM facturas"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        cur.execute(sql + " ORDER BY id_factura", params)
+        ids = [r[0] for r in cur.fetchall()]
+        cur.close()
+    return ids
+
+
+def firmar_lote(ids, procesos=None, progreso=None, ruta_clave=None):
+    """Firma ids leyendo y guardando de a BLOQUE facturas; devuelve cuántas firmó."""
+    from concurrent.futures import ProcessPoolExecutor
+    procesos = procesos or os.cpu_count() or 1
+    hechos = 0
+    with ProcessPoolExecutor(max_workers=procesos, initializer=firma.iniciar,
+                             initargs=(ruta_clave,)) as pool:
+        pendientes = []
+
+        def recoger():
+            nonlocal hechos
+            filas = pendientes.pop(0).result()
+            guardar_firmas(filas)
+            hechos += len(filas)
+            if progreso:
+                progreso(hechos, len(ids))
+
+        for i in range(0, len(ids), BLOQUE):
+            docs = cargar_documentos(ids[i:i + BLOQUE])
+            pendientes += [pool.submit(firma.sellar_bloque, docs[j:j + 50])
+                           for j in range(0, len(docs), 50)]
+            while len(pendientes) > 4 * procesos:
+                recoger()
+        while pendientes:
+            recoger()
+    return hechos
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Calcula el CUFE y firma facturas")
+    parser.add_argument("ids", nargs="*", type=int)
+    parser.add_argument("--desde")
+    parser.add_argument("--hasta")
+    parser.add_argument("--todas", action="store_true", help="volver a firmar las que ya tienen CUFE")
+    parser.add_argument("--procesos", type=int, help="por defecto, uno por núcleo")
+    parser.add_argument("--clave", help=f"por defecto {firma.RUTA_CLAVE}")
+    parser.add_argument("--generar-clave", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.generar_clave:
+        ruta = args.clave or firma.RUTA_CLAVE
+        try:
+            firma.generar_clave(ruta)
+        except FileExistsError:
+            print("Ya existe", ruta)
+            return 1
+        print("Clave creada en", ruta)
+        try:
+            preparar_esquema()
+        except Error as e:
+            print("Columnas cufe/firma sin crear (se crean al firmar con este comando):", e)
+        return 0
+
+    try:
+        firma.cargar_clave(args.clave or firma.RUTA_CLAVE)
+        preparar_esquema()
+        ids = args.ids or ids_a_firmar(args.desde, args.hasta, args.todas)
+        t = time.perf_counter()
+        hechos = firmar_lote(ids, args.procesos, ruta_clave=args.clave)
+    except (Error, OSError) as e:
+        print("Error:", e)
+        return 1
+    segundos = time.perf_counter() - t
+    print(f"{hechos} facturas firmadas en {segundos:.2f} s "
+          f"({hechos / segundos if segundos else 0:.0f}/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import os
+import tkinter as tk
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ICON_DIR = os.path.join(BASE_DIR, "assets", "icons")
+CACHE_DIR = os.path.join(BASE_DIR, "assets", "cache")
+
+# nombre -> tamaño con el que lo usa la interfaz
+ICONOS = {
+    "factura": (55, 55),
+    "consultar": (55, 55),
+    "cliente": (55, 55),
+    "producto": (55, 55),
+    "logo": (70, 70),
+}
+
+
+def _ruta_cache(nombre, size, mtime_ns):
+    return os.path.join(CACHE_DIR, f"{nombre}_{size[0]}x{size[1]}_{mtime_ns}.png")
+
+
+def _limpiar_viejos(nombre, size, vigente):
+    prefijo = f"{nombre}_{size[0]}x{size[1]}_"
+    for f in os.listdir(CACHE_DIR):
+        ruta = os.path.join(CACHE_DIR, f)
+        if f.startswith(prefijo) and ruta != vigente:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+
+def _escalar(origen, destino, size):
+    # PIL solo se importa cuando hay que regenerar la caché
+    from PIL import Image
+
+    img = Image.open(origen).resize(size, Image.LANCZOS)
+    tmp = destino + ".tmp"
+    img.save(tmp, format="PNG")
+    os.replace(tmp, destino)
+
+
+def ruta_icono(nombre, size=None):
+    """Devuelve la ruta del PNG ya escalado, generándolo si la caché no está al día."""
+    size = size or ICONOS[nombre]
+    origen = os.path.join(ICON_DIR, f"{nombre}.png")
+    destino = _ruta_cache(nombre, size, os.stat(origen).st_mtime_ns)
+    if not os.path.exists(destino):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _escalar(origen, destino, size)
+        _limpiar_viejos(nombre, size, destino)
+    return destino
+
+
+def cargar_icono(nombre, size=None, master=None):
+    try:
+        ruta = ruta_icono(nombre, size)
+    except (ImportError, OSError):
+        # sin PIL o sin permiso de escritura: se reduce el original con Tk
+        size = size or ICONOS[nombre]
+        img = tk.PhotoImage(master=master, file=os.path.join(ICON_DIR, f"{nombre}.png"))
+        factor = max(1, img.width() // size[0], img.height() // size[1])
+        return img.subsample(factor)
+    return tk.PhotoImage(master=master, file=ruta)
+
+
+def precalentar():
+    for nombre, size in ICONOS.items():
+        print(ruta_icono(nombre, size))
+
+
+if __name__ == "__main__":
+    precalentar()
@@ -0,0 +1,187 @@
+"""Importación masiva de clientes y productos desde CSV.
+
+    python importar.py clientes clientes.csv
+    python importar.py productos productos.csv --chunk 5000 --rechazos malos.csv
+
+El archivo se lee por bloques, así que la memoria no crece con su tamaño. Cada
+bloque se valida, se descartan los duplicados (por documento en clientes y por
+nombre en productos, tanto dentro del archivo como contra la base) y se inserta
+con un solo executemany. Se hace commit cada --commit-cada bloques.
+"""
+import csv
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from mysql.connector import Error
+
+from db import conexion
+from busqueda import normalizar
+from catalogo import get_catalogo
+
+CHUNK_SIZE = 5000
+COMMIT_EVERY = 10
+PRECIO_MAX = Decimal("99999999.99")     # productos.precio es DECIMAL(10, 2)
+STOCK_MAX = 2**31 - 1                   # productos.stock es INT
+
+
+def validar_cliente(row):
+    nombre = (row.get("nombre") or "").strip()
+    documento = (row.get("documento") or "").strip()
+    if not nombre:
+        return None, "nombre vacío"
+    if not documento:
+        return None, "documento vacío"
+    return (nombre, documento, (row.get("direccion") or "").strip(),
+            (row.get("telefono") or "").strip(), (row.get("correo") or "").strip()), None
+
+
+def validar_producto(row):
+    nombre = (row.get("nombre") or "").strip()
+    if not nombre:
+        return None, "nombre vacío"
+    try:
+        precio = Decimal((row.get("precio") or "").strip())
+        stock = int((row.get("stock") or "0").strip() or 0)
+    except (InvalidOperation, ValueError):
+        return None, "precio o stock inválidos"
+    # NaN e Infinity se leen como Decimal; sin esto el NaN corta la importación al compararlo
+    if not precio.is_finite():
+        return None, "precio inválido"
+    if precio < 0 or stock < 0:
+        return None, "precio o stock negativos"
+    if precio > PRECIO_MAX or stock > STOCK_MAX:
+        return None, "precio o stock fuera de rango"
+    return (nombre, (row.get("descripcion") or "").strip(), precio, stock), None
+
+
+TABLAS = {
+    "clientes": {
+        "validar": validar_cliente,
+        "clave": 1,     # posición de documento en la tupla validada
+        "existentes": "SELECT documento FROM clientes WHERE documento IN ({})",
+        "insert": """INSERT INTO clientes (nombre, documento, direccion, telefono, correo)
+                     VALUES (%s, %s, %s, %s, %s)""",
+    },
+    "productos": {
+        "validar": validar_producto,
+        "clave": 0,     # nombre
+        "existentes": "SELECT nombre FROM productos WHERE nombre IN ({})",
+        "insert": """INSERT INTO productos (nombre, descripcion, precio, stock)
+                     VALUES (%s, %s, %s, %s)""",
+    },
+}
+
+
+def _bloques(reader, size):
+    bloque = []
+    for row in reader:
+        bloque.append(row)
+        if len(bloque) >= size:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def _procesar_bloque(cur, spec, bloque, rechazar):
+    validas = {}
+    for row in bloque:
+        valores, motivo = spec["validar"](row)
+        if motivo:
+            rechazar(row, motivo)
+            continue
+        # la base compara sin mayúsculas ni tildes (collation *_ci): "Arroz" y "ARROZ" chocan
+        clave = normalizar(valores[spec["clave"]].strip())
+        if clave in validas:
+            rechazar(row, "duplicado en el archivo")
+            continue
+        validas[clave] = (row, valores)
+
+    if validas:
+        claves = [valores[spec["clave"]] for _, valores in validas.values()]
+        cur.execute(spec["existentes"].format(", ".join(["%s"] * len(claves))), claves)
+        for existente in cur.fetchall():
+            row, _ = validas.pop(normalizar(existente[0].strip()), (None, None))
+            if row is not None:
+                rechazar(row, "ya existe")
+
+    if validas:
+        cur.executemany(spec["insert"], [v for _, v in validas.values()])
+    return len(validas)
+
+
+def importar(tabla, ruta, chunk_size=CHUNK_SIZE, commit_every=COMMIT_EVERY,
+             ruta_rechazos=None, progreso=None):
+    spec = TABLAS[tabla]
+    stats = {"leidas": 0, "insertadas": 0, "rechazadas": 0, "segundos": 0.0}
+    inicio = time.perf_counter()
+
+    with open(ruta, newline="", encoding="utf-8-sig") as f, conexion() as conn:
+        if not conn:
+            raise Error("No hay conexión")
+        reader = csv.DictReader(f)
+        rechazos = None
+        if ruta_rechazos:
+            fr = open(ruta_rechazos, "w", newline="", encoding="utf-8")
+            rechazos = csv.DictWriter(fr, fieldnames=list(reader.fieldnames or []) + ["motivo"],
+                                      extrasaction="ignore")
+            rechazos.writeheader()
+
+        def rechazar(row, motivo):
+            stats["rechazadas"] += 1
+            if rechazos:
+                rechazos.writerow(dict(row, motivo=motivo))
+
+        cur = conn.cursor()
+        try:
+            for n, bloque in enumerate(_bloques(reader, chunk_size), 1):
+                stats["leidas"] += len(bloque)
+                stats["insertadas"] += _procesar_bloque(cur, spec, bloque, rechazar)
+                if n % commit_every == 0:
+                    conn.commit()
+                    if progreso:
+                        progreso(dict(stats, segundos=time.perf_counter() - inicio))
+            conn.commit()
+        except Error:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            if rechazos:
+                fr.close()
+
+    get_catalogo().invalidate(tabla)
+    stats["segundos"] = time.perf_counter() - inicio
+    return stats
+
+
+def _mostrar(stats):
+    segundos = stats["segundos"] or 1e-9
+    print(f"{stats['leidas']} leídas, {stats['insertadas']} insertadas, "
+          f"{stats['rechazadas']} rechazadas, {stats['leidas'] / segundos:.0f} filas/s")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Importa clientes o productos desde CSV")
+    parser.add_argument("tabla", choices=sorted(TABLAS))
+    parser.add_argument("archivo")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--commit-cada", type=int, default=COMMIT_EVERY,
+                        help="bloques por transacción")
+    parser.add_argument("--rechazos", help="CSV donde se escriben las filas rechazadas")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = importar(args.tabla, args.archivo, args.chunk, args.commit_cada,
+                         args.rechazos, progreso=_mostrar)
+    except Error as e:
+        print("Error:", e)
+        return 1
+    _mostrar(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
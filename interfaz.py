@@ -1,157 +1,80 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from tkinter import font as tkfont
 from datetime import datetime
 import os
-from PIL import Image, ImageTk
-
-from db import conectar
+import time
+
+import db
+from db import pool_stats
+from metricas import RUTA_LOG, SLOW_QUERY_MS, get_metricas
+import cola_offline
+import resumenes
+from exportar import exportar_facturas
+from catalogo import get_catalogo
+from ejecutor import DBExecutor
+from iconos import cargar_icono
 from mysql.connector import Error
-
-BASE_DIR = os.path.dirname(__file__)
-LOGO_PATH = os.path.join(BASE_DIR, "assets", "icons", "logo.png")
+from app.clientes.cliente import Cliente
+from app.productos.producto import Producto
+from app.facturas.factura import Factura
+from app.facturas.totales import redondear
+from app.documentos import firma
+# los helpers de datos viven en datos.py; se reexportan aquí para el código que los importaba de interfaz
+from datos import (fetch_clients, fetch_products, insert_client, insert_product,  # noqa: F401
+                   get_client_id_by_name, get_product_by_name, StockInsuficiente, reserve_stock,
+                   write_invoices, insert_invoice, insert_invoice_and_detail, fetch_invoices,
+                   estimate_invoice_count)
 
 COLOR_BG = "#AFEEEE"
 COLOR_HEADER = "#003366"
 COLOR_TEXT = "#1F0954"
 CARD_BG = "#E8F8F8"
 
-def fetch_clients():
-    conn = conectar()
-    if not conn:
-        return []
-    cur = conn.cursor()
-    cur.execute("SELECT id_cliente, nombre FROM clientes ORDER BY nombre")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
-
-
-def fetch_products():
-    conn = conectar()
-    if not conn:
-        return []
-    cur = conn.cursor()
-    cur.execute("SELECT id_producto, nombre, precio, stock FROM productos ORDER BY nombre")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
-
-
-def insert_client(nombre, documento, direccion, telefono, correo):
-    conn = conectar()
-    if not conn:
-        return False, "No hay conexión"
-    cur = conn.cursor()
-    try:
-        sql = """INSERT INTO clientes (nombre, documento, direccion, telefono, correo)
-                 VALUES (%s, %s, %s, %s, %s)"""
-        cur.execute(sql, (nombre, documento, direccion, telefono, correo))
-        conn.commit()
-        return True, None
-    except Error as e:
-        return False, str(e)
-    finally:
-        cur.close()
-        conn.close()
-
-
-def insert_product(nombre, descripcion, precio, stock):
-    conn = conectar()
-    if not conn:
-        return False, "No hay conexión"
-    cur = conn.cursor()
-    try:
-        sql = """INSERT INTO productos (nombre, descripcion, precio, stock)
-                 VALUES (%s, %s, %s, %s)"""
-        cur.execute(sql, (nombre, descripcion, precio, stock))
-        conn.commit()
-        return True, None
-    except Error as e:
-        return False, str(e)
-    finally:
-        cur.close()
-        conn.close()
-
-
-def get_client_id_by_name(nombre):
-    conn = conectar()
-    if not conn:
-        return None
-    cur = conn.cursor()
-    cur.execute("SELECT id_cliente FROM clientes WHERE nombre = %s", (nombre,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    return row[0] if row else None
-
-
-def get_product_by_name(nombre):
-    conn = conectar()
-    if not conn:
-        return None, None
-    cur = conn.cursor()
-    cur.execute("SELECT id_producto, precio FROM productos WHERE nombre = %s", (nombre,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    if row:
-        return row[0], float(row[1])
-    return None, None
-
-
-def insert_invoice_and_detail(id_cliente, id_producto, cantidad, precio):
-    conn = conectar()
-    if not conn:
-        return False, "No hay conexión"
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO facturas (id_cliente, fecha) VALUES (%s, CURDATE())", (id_cliente,))
-        id_factura = cur.lastrowid
-
-        cur.execute(
-            "INSERT INTO detalle_factura (id_factura, id_producto, cantidad, precio) VALUES (%s, %s, %s, %s)",
-            (id_factura, id_producto, cantidad, precio)
-        )
+class Pantalla(ttk.Frame):
+    """Base de las pantallas: las consultas corren en el DBExecutor de la App."""
 
-        cur.execute("""
-            UPDATE facturas f SET total = (
-               SELECT SUM(df.subtotal) FROM detalle_factura df WHERE df.id_factura = f.id_factura
-            ) WHERE f.id_factura = %s
-        """, (id_factura,))
-
-        conn.commit()
-        return True, None
-    except Error as e:
-        return False, str(e)
-    finally:
-        cur.close()
-        conn.close()
-
-
-def fetch_invoices(filter_cliente=None):
-    conn = conectar()
-    if not conn:
-        return []
-    cur = conn.cursor()
-    base = """SELECT f.id_factura, c.nombre, f.fecha, f.total
-              FROM facturas f
-              JOIN clientes c ON f.id_cliente = c.id_cliente"""
-    if filter_cliente:
-        cur.execute(base + " WHERE c.nombre LIKE %s ORDER BY f.fecha DESC", (f"%{filter_cliente}%",))
-    else:
-        cur.execute(base + " ORDER BY f.fecha DESC")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
-
-class Login(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        self.busy = ttk.Progressbar(self, mode="indeterminate", length=160)
+
+    def run_db(self, fn, *args, callback=None, **kwargs):
+        return self.controller.db.submit(fn, *args, callback=callback,
+                                         errback=self.db_error, owner=self, **kwargs)
+
+    def run_write(self, fn, *args, callback=None, **kwargs):
+        """Como run_db, pero al salir de la pantalla no se cancela: el callback siempre llega."""
+        return self.controller.db.submit(fn, *args, callback=callback, errback=self.db_error,
+                                         owner=self, cancelable=False, **kwargs)
+
+    def is_busy(self):
+        return self.controller.db.pending(self) > 0
+
+    def db_error(self, e):
+        messagebox.showerror("Error", str(e))
+
+    def set_busy(self, busy):
+        if busy:
+            self.busy.place(relx=1.0, rely=1.0, anchor="se", x=-10, y=-10)
+            self.busy.lift()
+            self.busy.start(12)
+            self.configure(cursor="watch")
+        else:
+            self.busy.stop()
+            self.busy.place_forget()
+            self.configure(cursor="")
+
+    def on_show(self):
+        pass
+
+    def on_hide(self):
+        self.controller.db.cancel(self)
+
+
+class Login(Pantalla):
+    def __init__(self, parent, controller):
+        super().__init__(parent, controller)
 
         header = tk.Frame(self, bg=COLOR_HEADER, height=80)
         header.pack(fill="x")
@@ -173,10 +96,9 @@ class Login(ttk.Frame):
                    command=lambda: controller.show_frame("Dashboard")).grid(row=2, column=0, columnspan=2, pady=15)
 
 
-class Dashboard(ttk.Frame):
+class Dashboard(Pantalla):
     def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
+        super().__init__(parent, controller)
 
         header = tk.Frame(self, bg=COLOR_HEADER, height=70)
         header.pack(fill="x")
@@ -192,6 +114,21 @@ class Dashboard(ttk.Frame):
         ttk.Label(header, text="Menu Principal", foreground="white",
                   background=COLOR_HEADER, font=("Segoe UI", 16, "bold")).pack(side="left", padx=20)
 
+        kpi_bar = tk.Frame(self, bg=CARD_BG, bd=1, relief="groove")
+        kpi_bar.pack(fill="x", padx=12, pady=(8, 0))
+        self.kpis = {}
+        for key, text in (("facturas_hoy", "Facturas hoy"), ("ventas_hoy", "Ventas hoy"),
+                          ("ventas_mes", "Ventas del mes"), ("top_producto", "Producto más vendido")):
+            cell = tk.Frame(kpi_bar, bg=CARD_BG)
+            cell.pack(side="left", expand=True, pady=6)
+            tk.Label(cell, text=text, bg=CARD_BG, fg=COLOR_TEXT).pack()
+            self.kpis[key] = tk.Label(cell, text="–", bg=CARD_BG, fg=COLOR_TEXT,
+                                      font=("Segoe UI", 13, "bold"))
+            self.kpis[key].pack()
+
+        self.lbl_cola = tk.Label(self, text="", bg=COLOR_BG, fg=COLOR_TEXT)
+        self.lbl_cola.pack()
+
         body = tk.Frame(self, bg=COLOR_BG)
         body.pack(expand=True)
 
@@ -210,9 +147,28 @@ class Dashboard(ttk.Frame):
         self.card("Registrar producto", cards, 1, 1,
         lambda: controller.show_frame("RegisterProduct"),controller.icon_producto)
 
+        ttk.Button(body, text="Diagnóstico",
+                   command=lambda: controller.show_frame("Diagnostico")).pack(pady=(10, 0))
         ttk.Button(body, text="Cerrar sesión",
                    command=lambda: controller.show_frame("Login")).pack(pady=10)
 
+    def on_show(self):
+        self.mostrar_cola()
+        self.run_db(resumenes.kpis, callback=self.mostrar_kpis)
+
+    def mostrar_cola(self):
+        n = cola_offline.pendientes()
+        self.lbl_cola.config(text=f"{n} operaciones sin conexión pendientes de enviar" if n else "")
+
+    def mostrar_kpis(self, datos):
+        if not datos:
+            return
+        for key, lbl in self.kpis.items():
+            valor = datos.get(key)
+            if key.startswith("ventas"):
+                valor = f"${valor:,.2f}"
+            lbl.config(text=valor if valor is not None else "–")
+
     def card(self, text, container, r, c, cmd,icon):
         frame = tk.Frame(container, bg=CARD_BG, width=420, height=150, bd=1, relief="raised")
         frame.grid(row=r, column=c, padx=12, pady=12)
@@ -226,10 +182,13 @@ class Dashboard(ttk.Frame):
         ttk.Button(frame, text="Abrir", command=cmd).pack(pady=8)
 
 
-class RegisterInvoice(ttk.Frame):
+TYPEAHEAD_LIMIT = 50
+TYPEAHEAD_DELAY_MS = 200
+
+
+class RegisterInvoice(Pantalla):
     def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
+        super().__init__(parent, controller)
 
         header = tk.Frame(self, bg=COLOR_HEADER, height=60)
         header.pack(fill="x")
@@ -255,39 +214,85 @@ class RegisterInvoice(ttk.Frame):
         self.txt_cantidad = ttk.Entry(body, width=40)
         self.txt_cantidad.grid(row=3, column=1, pady=6)
 
+        lines_btns = ttk.Frame(body)
+        lines_btns.grid(row=4, column=0, columnspan=2, pady=6)
+        ttk.Button(lines_btns, text="Agregar línea", command=self.agregar_linea).pack(side="left", padx=8)
+        ttk.Button(lines_btns, text="Quitar línea", command=self.quitar_linea).pack(side="left", padx=8)
+
+        cols = ("producto", "cantidad", "precio", "subtotal")
+        self.tree_lineas = ttk.Treeview(body, columns=cols, show="headings", height=8)
+        for c in cols:
+            self.tree_lineas.heading(c, text=c.capitalize())
+            self.tree_lineas.column(c, width=150)
+        self.tree_lineas.grid(row=5, column=0, columnspan=2, pady=6)
+
         self.lbl_total = ttk.Label(body, text="Total: $0", font=("Segoe UI", 12, "bold"))
-        self.lbl_total.grid(row=4, column=0, columnspan=2, pady=12)
+        self.lbl_total.grid(row=6, column=0, columnspan=2, pady=12)
 
         btns = ttk.Frame(body)
-        btns.grid(row=5, column=0, columnspan=2, pady=10)
+        btns.grid(row=7, column=0, columnspan=2, pady=10)
         ttk.Button(btns, text="Calcular", command=self.calcular).pack(side="left", padx=8)
         ttk.Button(btns, text="Guardar", command=self.guardar).pack(side="left", padx=8)
         ttk.Button(btns, text="Volver",
                    command=lambda: controller.show_frame("Dashboard")).pack(side="left", padx=8)
 
+        self.factura = Factura(None)
+
+        self._filtros = {}
+        self.cb_cliente.bind("<KeyRelease>", lambda e: self.programar_filtro(e, self.cb_cliente, "clientes"))
+        self.cb_producto.bind("<KeyRelease>", lambda e: self.programar_filtro(e, self.cb_producto, "productos"))
+        self.cb_producto.bind("<<ComboboxSelected>>", self.producto_elegido)
+
+    def on_show(self):
         self.load_data()
 
     def load_data(self):
-        clients = fetch_clients()
-        products = fetch_products()
-        self.cb_cliente["values"] = [c[1] for c in clients]
-        self.cb_producto["values"] = [p[1] for p in products]
+        def cargar():
+            catalogo = get_catalogo()
+            catalogo.refresh()
+            return (catalogo.sugerir("clientes", "", TYPEAHEAD_LIMIT),
+                    catalogo.sugerir("productos", "", TYPEAHEAD_LIMIT))
+        self.run_db(cargar, callback=self.mostrar_catalogo)
+
+    def mostrar_catalogo(self, data):
+        clientes, productos = data
+        self.cb_cliente["values"] = clientes
+        self.cb_producto["values"] = productos
+
+    def programar_filtro(self, event, combo, tabla):
+        # se filtra cuando el usuario deja de escribir, no en cada tecla
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        pendiente = self._filtros.pop(tabla, None)
+        if pendiente:
+            self.after_cancel(pendiente)
+        self._filtros[tabla] = self.after(TYPEAHEAD_DELAY_MS, lambda: self.filtrar(combo, tabla))
+
+    def filtrar(self, combo, tabla):
+        self._filtros.pop(tabla, None)
+        combo["values"] = get_catalogo().sugerir(tabla, combo.get(), TYPEAHEAD_LIMIT)
+
+    def producto_elegido(self, event=None):
+        precio = get_catalogo().precio(self.cb_producto.get())
+        if precio is not None:
+            self.txt_precio.delete(0, tk.END)
+            self.txt_precio.insert(0, f"{redondear(precio)}")
 
-    def calcular(self):
-        try:
-            p = float(self.txt_precio.get())
-            c = int(self.txt_cantidad.get())
-            self.lbl_total.config(text=f"Total: ${p*c:.2f}")
-        except:
-            messagebox.showerror("Error", "Datos inválidos")
+    def refrescar_lineas(self):
+        self.tree_lineas.delete(*self.tree_lineas.get_children())
+        for prod, cant in self.factura.detalles:
+            self.tree_lineas.insert("", tk.END, values=(
+                prod.nombre, cant, f"{prod.precio:.2f}", f"{prod.precio * cant:.2f}"))
+        self.lbl_total.config(text=f"Total: ${self.factura.total():.2f}")
 
-    def guardar(self):
-        cliente = self.cb_cliente.get()
+    def agregar_linea(self):
+        if self.is_busy():
+            return
         producto = self.cb_producto.get()
         cantidad = self.txt_cantidad.get()
 
-        if not cliente or not producto or not cantidad:
-            messagebox.showerror("Error", "Completa todos los campos")
+        if not producto or not cantidad:
+            messagebox.showerror("Error", "Selecciona producto y cantidad")
             return
 
         try:
@@ -295,26 +300,90 @@ class RegisterInvoice(ttk.Frame):
         except:
             messagebox.showerror("Error", "Cantidad inválida")
             return
+        if cantidad <= 0:
+            messagebox.showerror("Error", "La cantidad debe ser mayor que cero")
+            return
 
-        id_cliente = get_client_id_by_name(cliente)
-        id_producto, precio = get_product_by_name(producto)
+        self.run_db(get_catalogo().producto, producto,
+                    callback=lambda r: self.linea_resuelta(producto, cantidad, r))
 
-        ok, err = insert_invoice_and_detail(id_cliente, id_producto, cantidad, precio)
+    def linea_resuelta(self, producto, cantidad, resultado):
+        id_producto, precio = resultado
+        if id_producto is None:
+            messagebox.showerror("Error", "Producto no encontrado")
+            return
+
+        self.factura.agregar_producto(Producto(producto, precio, id_producto=id_producto), cantidad)
+        self.cb_producto.set("")
+        self.txt_precio.delete(0, tk.END)
+        self.txt_cantidad.delete(0, tk.END)
+        self.refrescar_lineas()
+
+    def quitar_linea(self):
+        sel = self.tree_lineas.selection()
+        if not sel or self.is_busy():
+            return
+        self.factura.quitar_producto(self.tree_lineas.index(sel[0]))
+        self.refrescar_lineas()
+
+    def calcular(self):
+        try:
+            p = redondear(self.txt_precio.get())
+            c = int(self.txt_cantidad.get())
+            self.lbl_total.config(text=f"Línea: ${p*c}   Total: ${self.factura.total()}")
+        except (ArithmeticError, ValueError):
+            messagebox.showerror("Error", "Datos inválidos")
+
+    def guardar(self):
+        if self.is_busy():
+            return
+        cliente = self.cb_cliente.get()
+
+        if not cliente or not self.factura.detalles:
+            messagebox.showerror("Error", "Selecciona un cliente y agrega al menos una línea")
+            return
+
+        def guardar_factura(factura):
+            id_cliente = get_catalogo().cliente_id(cliente)
+            if id_cliente is None:
+                return False, "Cliente no encontrado"
+            factura.cliente = Cliente(cliente, None, id_cliente=id_cliente)
+            ok, err = insert_invoice(factura)
+            if ok and factura.id_factura is not None and firma.hay_clave():
+                # la factura ya quedó guardada; si falla la firma la toma luego firmar.py
+                from firmar import firmar_factura
+                try:
+                    firmar_factura(factura.id_factura)
+                except (Error, OSError) as e:
+                    return True, f"Factura guardada pero sin firmar: {e}"
+            return ok, err
+
+        self.run_write(guardar_factura, self.factura, callback=self.factura_guardada)
+
+    def factura_guardada(self, resultado):
+        ok, err = resultado
         if ok:
-            messagebox.showinfo("Éxito", "Factura guardada correctamente")
+            if err:
+                messagebox.showwarning("Factura", err)
+            else:
+                messagebox.showinfo("Éxito", "Factura guardada correctamente")
+            self.factura = Factura(None)
             self.cb_cliente.set("")
             self.cb_producto.set("")
             self.txt_precio.delete(0, tk.END)
             self.txt_cantidad.delete(0, tk.END)
-            self.lbl_total.config(text="Total: $0")
+            self.refrescar_lineas()
         else:
             messagebox.showerror("Error", err)
 
 
-class ConsultInvoices(ttk.Frame):
+PAGE_SIZE = 200
+MAX_PAGES = 3
+
+
+class ConsultInvoices(Pantalla):
     def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
+        super().__init__(parent, controller)
 
         header = tk.Frame(self, bg=COLOR_HEADER, height=60)
         header.pack(fill="x")
@@ -336,37 +405,149 @@ class ConsultInvoices(ttk.Frame):
         self.txt_buscar.pack(side="left", padx=6)
         ttk.Button(sf, text="Buscar", command=self.buscar).pack(side="left", padx=6)
         ttk.Button(sf, text="Ver todo", command=self.cargar_todo).pack(side="left", padx=6)
+        ttk.Button(sf, text="Exportar", command=self.exportar).pack(side="left", padx=6)
 
+        table = ttk.Frame(body)
+        table.pack(fill="both", expand=True, pady=10)
         cols = ("id", "cliente", "fecha", "total")
-        self.tree = ttk.Treeview(body, columns=cols, show="headings", height=15)
+        self.tree = ttk.Treeview(table, columns=cols, show="headings", height=15)
         for c in cols:
             self.tree.heading(c, text=c.capitalize())
             self.tree.column(c, width=200)
-        self.tree.pack(fill="both", expand=True, pady=10)
+        self.scroll = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scroll.pack(side="right", fill="y")
+
+        self.lbl_estado = ttk.Label(body, text="")
+        self.lbl_estado.pack()
 
-    
         ttk.Button(
             body,
             text="Volver al menú",
             command=lambda: controller.show_frame("Dashboard")
         ).pack(pady=10)
 
+        self.reiniciar(None, cargar=False)
+
+    def on_show(self):
         self.cargar_todo()
 
     def cargar_todo(self):
-        self.tree.delete(*self.tree.get_children())
-        for r in fetch_invoices():
-            self.tree.insert("", tk.END, values=r)
+        self.reiniciar(None)
 
     def buscar(self):
-        text = self.txt_buscar.get()
+        text = self.txt_buscar.get().strip()
+        if not text:
+            self.reiniciar(None)
+            return
+        self.controller.db.cancel(self)
+        self.run_db(get_catalogo().buscar_clientes, text, callback=self.reiniciar)
+
+    def reiniciar(self, filtro, cargar=True):
+        # En el Treeview solo viven las páginas de la ventana (a lo sumo MAX_PAGES);
+        # al desplazarse se cargan las vecinas y se descartan las lejanas.
+        self.controller.db.cancel(self)
+        self.filtro = filtro
+        self.cursores = [None]      # clave 'after' con la que se pide cada página
+        self.ventana = []           # [(num_pagina, [items])]
+        self.ultima = None          # última página, cuando ya se conoce
+        self.cargando = False
+        self.total_estimado = None
         self.tree.delete(*self.tree.get_children())
-        for r in fetch_invoices(text):
-            self.tree.insert("", tk.END, values=r)
+        if cargar:
+            self.cargar_pagina(0)
+            if filtro is None:
+                self.run_db(estimate_invoice_count, callback=self.mostrar_total)
+
+    def cargar_pagina(self, n):
+        self.cargando = True
+        self.run_db(fetch_invoices, after=self.cursores[n], limit=PAGE_SIZE, id_clientes=self.filtro,
+                    callback=lambda rows: self.pagina_cargada(n, rows))
+
+    def pagina_cargada(self, n, rows):
+        self.cargando = False
+        if len(rows) == PAGE_SIZE and n + 1 == len(self.cursores):
+            self.cursores.append((rows[-1][2], rows[-1][0]))
+        elif len(rows) < PAGE_SIZE:
+            self.ultima = n if rows else n - 1
+        if not rows:
+            self.actualizar_estado()
+            return
+
+        total = len(self.tree.get_children())
+        top = round(float(self.tree.yview()[0]) * total)
+        if not self.ventana or n > self.ventana[-1][0]:
+            items = [self.tree.insert("", tk.END, values=r) for r in rows]
+            self.ventana.append((n, items))
+            if len(self.ventana) > MAX_PAGES:
+                _, viejos = self.ventana.pop(0)
+                self.tree.delete(*viejos)
+                top -= len(viejos)
+        else:
+            items = [self.tree.insert("", i, values=r) for i, r in enumerate(rows)]
+            self.ventana.insert(0, (n, items))
+            top += len(items)
+            if len(self.ventana) > MAX_PAGES:
+                _, viejos = self.ventana.pop()
+                self.tree.delete(*viejos)
+        total = len(self.tree.get_children())
+        self.tree.yview_moveto(max(top, 0) / total)
+        self.actualizar_estado()
+
+    def on_scroll(self, first, last):
+        self.scroll.set(first, last)
+        if self.cargando or not self.ventana:
+            return
+        if float(last) > 0.9 and (self.ultima is None or self.ventana[-1][0] < self.ultima):
+            self.cargar_pagina(self.ventana[-1][0] + 1)
+        elif float(first) < 0.1 and self.ventana[0][0] > 0:
+            self.cargar_pagina(self.ventana[0][0] - 1)
+
+    def exportar(self):
+        if self.filtro is not None and not self.filtro:
+            messagebox.showinfo("Exportar", "No hay facturas para exportar")
+            return
+        ruta = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Comprimido", "*.gz")])
+        if not ruta:
+            return
+        avance = {"facturas": 0}
+
+        def progreso(facturas, lineas):
+            avance["facturas"] = facturas     # lo lee mostrar_avance desde el hilo de Tk
+
+        self.run_write(exportar_facturas, ruta, id_clientes=self.filtro, progreso=progreso,
+                    callback=lambda r: messagebox.showinfo(
+                        "Exportar", f"{r[0]} facturas ({r[1]} líneas) exportadas"))
+        self.mostrar_avance(avance)
+
+    def mostrar_avance(self, avance):
+        if not self.is_busy():
+            self.actualizar_estado()
+            return
+        self.lbl_estado.config(text=f"Exportando… {avance['facturas']} facturas")
+        self.after(250, lambda: self.mostrar_avance(avance))
+
+    def mostrar_total(self, total):
+        self.total_estimado = total
+        self.actualizar_estado()
 
-class RegisterClient(ttk.Frame):
+    def actualizar_estado(self):
+        if not self.ventana:
+            self.lbl_estado.config(text="Sin facturas")
+            return
+        desde = self.ventana[0][0] * PAGE_SIZE + 1
+        hasta = desde + len(self.tree.get_children()) - 1
+        texto = f"Facturas {desde}–{hasta}"
+        if self.total_estimado:
+            texto += f" de ~{self.total_estimado}"
+        self.lbl_estado.config(text=texto)
+
+class RegisterClient(Pantalla):
     def __init__(self, parent, controller):
-        super().__init__(parent)
+        super().__init__(parent, controller)
 
         header = tk.Frame(self, bg=COLOR_HEADER, height=60)
         header.pack(fill="x")
@@ -413,10 +594,9 @@ class RegisterClient(ttk.Frame):
         )
 
 
-class RegisterProduct(ttk.Frame):
+class RegisterProduct(Pantalla):
     def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
+        super().__init__(parent, controller)
 
         header = tk.Frame(self, bg=COLOR_HEADER, height=60)
         header.pack(fill="x")
@@ -442,6 +622,8 @@ class RegisterProduct(ttk.Frame):
                    command=lambda: controller.show_frame("Dashboard")).pack(side="left", padx=8)
 
     def guardar(self):
+        if self.is_busy():
+            return
         n = self.e["nombre"].get()
         p = self.e["precio"].get()
 
@@ -450,21 +632,28 @@ class RegisterProduct(ttk.Frame):
             return
 
         try:
-            precio = float(p)
+            precio = redondear(p)
             stock = int(self.e["stock"].get()) if self.e["stock"].get() else 0
         except:
             messagebox.showerror("Error", "Precio o stock inválidos")
             return
 
-        ok, err = insert_product(
+        self.run_write(
+            insert_product,
             self.e["nombre"].get(),
             self.e["descripción"].get(),
             precio,
-            stock
+            stock,
+            callback=self.producto_guardado
         )
 
+    def producto_guardado(self, resultado):
+        ok, err = resultado
         if ok:
-            messagebox.showinfo("Guardado", "Producto registrado")
+            if err:
+                messagebox.showwarning("Producto", err)
+            else:
+                messagebox.showinfo("Guardado", "Producto registrado")
             for x in self.e.values():
                 x.delete(0, tk.END)
         else:
@@ -472,51 +661,185 @@ class RegisterProduct(ttk.Frame):
 
 
 
+DIAG_REFRESH_MS = 2000
+
+
+class Diagnostico(Pantalla):
+    """Estadísticas en vivo de consultas, pool, transacciones y caché (ver metricas.py)."""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, controller)
+        self._after_id = None
+
+        header = tk.Frame(self, bg=COLOR_HEADER, height=60)
+        header.pack(fill="x")
+        ttk.Label(header, text="Diagnóstico", foreground="white",
+                  background=COLOR_HEADER, font=controller.title_font).pack(padx=20, pady=12)
+
+        body = ttk.Frame(self, padding=12)
+        body.pack(fill="both", expand=True)
+
+        self.lbl_resumen = ttk.Label(body, text="", justify="left")
+        self.lbl_resumen.pack(fill="x")
+
+        table = ttk.Frame(body)
+        table.pack(fill="both", expand=True, pady=10)
+        cols = ("sql", "n", "p50", "p95", "max", "filas", "errores", "lentas")
+        self.tree = ttk.Treeview(table, columns=cols, show="headings", height=14)
+        for c in cols:
+            self.tree.heading(c, text=c.capitalize())
+            self.tree.column(c, width=70, anchor="e")
+        self.tree.column("sql", width=480, anchor="w")
+        scroll = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scroll.pack(side="right", fill="y")
+
+        btns = ttk.Frame(body)
+        btns.pack(pady=6)
+        ttk.Button(btns, text="Reiniciar contadores", command=self.reiniciar).pack(side="left", padx=6)
+        ttk.Button(btns, text="Volver al menú",
+                   command=lambda: controller.show_frame("Dashboard")).pack(side="left", padx=6)
+
+    def on_show(self):
+        self.refrescar()
+
+    def on_hide(self):
+        super().on_hide()
+        self._cancelar_refresco()
+
+    def _cancelar_refresco(self):
+        if self._after_id:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+
+    def reiniciar(self):
+        get_metricas().reiniciar()
+        self.refrescar()
+
+    def refrescar(self):
+        # un solo ciclo de after() aunque se llame desde el botón o al volver a la pantalla
+        self._cancelar_refresco()
+        datos = get_metricas().snapshot()
+        pool, tx, ex = pool_stats(), db.tx_stats, self.controller.db
+        cat = get_catalogo().stats()
+        espera = datos["espera_conexion"]
+        self.lbl_resumen.config(text=(
+            f"Pool: {pool['in_use']}/{pool['size']} en uso, {pool['idle']} libres, "
+            f"{pool['timeouts']} timeouts   ·   Espera por conexión: p50 {espera['p50_ms']:.1f} ms, "
+            f"p95 {espera['p95_ms']:.1f} ms, máx {espera['max_ms']:.1f} ms, {espera['errores']} fallos\n"
+            f"Transacciones: {tx['commits']} commits, {tx['retries']} reintentos, {tx['failures']} fallos"
+            f"   ·   Tareas: {ex.submitted} enviadas, {ex.completed} completas, {ex.cancelled} canceladas\n"
+            f"Catálogo: {cat['hits']} aciertos, {cat['misses']} fallos"
+            f"{', sin conexión' if cat['sin_conexion'] else ''}   ·   "
+            f"Cola sin conexión: {cola_offline.pendientes()}   ·   "
+            f"Lentas (≥ {SLOW_QUERY_MS:.0f} ms) en {RUTA_LOG}"))
+
+        self.tree.delete(*self.tree.get_children())
+        for c in datos["consultas"]:
+            self.tree.insert("", "end", values=(
+                c["sql"][:200], c["n"], f"{c['p50_ms']:.1f}", f"{c['p95_ms']:.1f}",
+                f"{c['max_ms']:.1f}", c["filas"], c["errores"], c["lentas"]))
+        self._after_id = self.after(DIAG_REFRESH_MS, self.refrescar)
+
+
+PAGES = (Login, Dashboard, RegisterInvoice, ConsultInvoices, RegisterClient, RegisterProduct,
+         Diagnostico)
+
+
+SYNC_MS = 15000
+
+
 class App(tk.Tk):
     def __init__(self):
+        t0 = time.perf_counter()
         super().__init__()
+        self.timings = {"tk": time.perf_counter() - t0}
         
-        self.icon_factura = ImageTk.PhotoImage(
-    Image.open("assets/icons/factura.png").resize((55, 55))
-        )
-        self.icon_consultar = ImageTk.PhotoImage(
-    Image.open("assets/icons/consultar.png").resize((55, 55))
-        )
-        self.icon_cliente = ImageTk.PhotoImage(
-    Image.open("assets/icons/cliente.png").resize((55, 55))
-        )
-        self.icon_producto = ImageTk.PhotoImage(
-    Image.open("assets/icons/producto.png").resize((55, 55))            
-        )
+        t = time.perf_counter()
+        self.icon_factura = cargar_icono("factura", master=self)
+        self.icon_consultar = cargar_icono("consultar", master=self)
+        self.icon_cliente = cargar_icono("cliente", master=self)
+        self.icon_producto = cargar_icono("producto", master=self)
 
         self.title("EasyFact One - Sistema de Facturación")
         self.geometry("1000x650")
         self.configure(bg=COLOR_BG)
         self.resizable(False, False)
-        
-        LOGO_PATH = os.path.join("assets", "icons", "logo.png")
-        self.logo_img = Image.open(LOGO_PATH).resize((70, 70),Image.LANCZOS)
-        self.logo = ImageTk.PhotoImage(self.logo_img)
+
+        self.logo = cargar_icono("logo", master=self)
         
         logo_frame = tk.Frame(bg=COLOR_HEADER)
         logo_frame.pack(side="left", padx=20)
+        self.timings["icons"] = time.perf_counter() - t
 
         self.title_font = tkfont.Font(family="Segoe UI", size=16, weight="bold")
 
-        container = ttk.Frame(self)
-        container.pack(fill="both", expand=True, padx=10, pady=10)
+        self.db = DBExecutor(self)
+        self.protocol("WM_DELETE_WINDOW", self.cerrar)
+        self.current = None
 
-        self.frames = {}
-        for F in (Login, Dashboard, RegisterInvoice, ConsultInvoices, RegisterClient, RegisterProduct):
-            page = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[page] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        self.container = ttk.Frame(self)
+        self.container.pack(fill="both", expand=True, padx=10, pady=10)
 
+        self.pages = {F.__name__: F for F in PAGES}
+        self.frames = {}
         self.show_frame("Login")
+        self.timings["startup"] = time.perf_counter() - t0
+
+        if os.environ.get("EASYFACT_TIMINGS"):
+            print(self.startup_report())
+        self._sync_id = self.after(SYNC_MS, self.sincronizar_cola)
+
+    def sincronizar_cola(self):
+        """Cada SYNC_MS reenvía en segundo plano lo que quedó encolado sin conexión."""
+        if cola_offline.pendientes():
+            self.db.submit(cola_offline.sincronizar, callback=self.cola_sincronizada,
+                           errback=lambda e: None)
+        self._sync_id = self.after(SYNC_MS, self.sincronizar_cola)
+
+    def cola_sincronizada(self, resultado):
+        aplicadas, rechazadas, _ = resultado
+        if aplicadas:
+            get_catalogo().invalidate()
+        if rechazadas:
+            messagebox.showwarning("Sincronización",
+                                   f"{rechazadas} operaciones hechas sin conexión fueron rechazadas; "
+                                   "revisa con: python cola_offline.py --listar")
+        if self.current == "Dashboard":
+            self.frames["Dashboard"].mostrar_cola()
+
+    def get_frame(self, page):
+        """Construye la pantalla la primera vez que se pide."""
+        frame = self.frames.get(page)
+        if frame is None:
+            t = time.perf_counter()
+            frame = self.pages[page](parent=self.container, controller=self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.frames[page] = frame
+            self.timings[f"frame:{page}"] = time.perf_counter() - t
+        return frame
 
     def show_frame(self, page):
-        self.frames[page].tkraise()
+        if self.current and self.current != page:
+            self.frames[self.current].on_hide()
+        self.current = page
+        frame = self.get_frame(page)
+        frame.tkraise()
+        frame.on_show()
+
+    def startup_report(self):
+        lines = ["Tiempos de arranque:"]
+        for name, secs in self.timings.items():
+            lines.append(f"  {name:<28}{secs * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+    def cerrar(self):
+        if os.environ.get("EASYFACT_TIMINGS"):
+            print(self.startup_report())
+        self.after_cancel(self._sync_id)
+        self.db.shutdown()
+        self.destroy()
 
 if __name__ == "__main__":
     app = App()
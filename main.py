@@ -1,4 +1,94 @@
-from interfaz import crear_interfaz
+"""Punto de entrada de EasyFact One.
+
+    python main.py                          # interfaz gráfica
+    python main.py facturas --cliente Ana   # consultas y procesos sin interfaz
+    python main.py exportar facturas.csv.gz --desde 2026-01-01
+    python main.py --help
+
+Cada comando importa su módulo recién cuando se usa: el modo sin interfaz no
+carga tkinter ni los íconos, y --help no carga ni el conector de MySQL.
+"""
+import importlib
+import os
+import sys
+import time
+
+# comando -> (módulo con main(argv), descripción)
+COMANDOS = {
+    "gui": (None, "abre la interfaz gráfica (por defecto)"),
+    "facturas": (None, "lista las facturas más recientes"),
+    "kpis": ("resumenes", "indicadores de ventas; --reconstruir recalcula los resúmenes"),
+    "importar": ("importar", "importa clientes o productos desde CSV"),
+    "exportar": ("exportar", "exporta facturas a CSV o JSONL"),
+    "lote": ("facturacion_lote", "facturación masiva desde un plan CSV"),
+    "documentos": ("documentos", "genera XML y PDF de facturas"),
+    "firmar": ("firmar", "calcula el CUFE y firma facturas"),
+    "sincronizar": ("cola_offline", "envía lo que quedó guardado sin conexión"),
+    "api": ("api", "API HTTP local para las cajas"),
+}
+
+
+def ayuda():
+    print(__doc__.strip().splitlines()[0])
+    print("\nUso: python main.py [comando] [opciones]   (python main.py <comando> --help)\n")
+    for nombre, (_, descripcion) in COMANDOS.items():
+        print(f"  {nombre:<12} {descripcion}")
+    return 0
+
+
+def gui():
+    t = time.perf_counter()
+    from interfaz import App
+    importado = time.perf_counter() - t
+    app = App()
+    app.timings["import:interfaz"] = importado
+    app.mainloop()
+    return 0
+
+
+def facturas(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="main.py facturas", description=COMANDOS["facturas"][1])
+    parser.add_argument("--cliente", help="parte del nombre del cliente")
+    parser.add_argument("--limite", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    from mysql.connector import Error
+    from catalogo import get_catalogo
+    from datos import fetch_invoices
+    try:
+        # el nombre se resuelve en el índice del catálogo, como en la interfaz y la API
+        id_clientes = get_catalogo().buscar_clientes(args.cliente) if args.cliente else None
+        rows = fetch_invoices(id_clientes=id_clientes, limit=args.limite)
+    except Error as e:
+        print("Error:", e)
+        return 1
+    for id_factura, cliente, fecha, total in rows:
+        print(f"{id_factura:>8}  {fecha}  {total:>12}  {cliente}")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    comando, resto = (argv[0], argv[1:]) if argv else ("gui", [])
+    if comando in ("-h", "--help", "ayuda"):
+        return ayuda()
+    if comando not in COMANDOS:
+        print(f"Comando desconocido: {comando}\n")
+        ayuda()
+        return 2
+    if comando == "gui":
+        return gui()
+    if comando == "facturas":
+        return facturas(resto)
+
+    t = time.perf_counter()
+    modulo = importlib.import_module(COMANDOS[comando][0])
+    if os.environ.get("EASYFACT_TIMINGS"):
+        print(f"import {modulo.__name__}: {(time.perf_counter() - t) * 1000:.1f} ms", file=sys.stderr)
+    sys.argv[0] = f"main.py {comando}"
+    return modulo.main(resto) or 0
+
 
 if __name__ == "__main__":
-    crear_interfaz()
+    sys.exit(main())
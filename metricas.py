@@ -0,0 +1,235 @@
+"""Tiempos por consulta, filas devueltas, espera por conexión y log de consultas lentas.
+
+db.conexion() entrega las conexiones envueltas en ConexionMedida, así que todo
+cursor que usan los helpers queda medido sin cambiar su código. Cada sentencia
+se agrupa por su SQL normalizado (espacios colapsados, listas IN (...)
+resumidas) y acumula un histograma de latencias (execute + fetch), filas y
+errores. Las que superan SLOW_QUERY_MS se escriben en logs/consultas_lentas.log
+con los parámetros reemplazados por su tipo: nunca se registran valores.
+"""
+import bisect
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+SLOW_QUERY_MS = float(os.environ.get("EASYFACT_SLOW_MS", 200))
+RUTA_LOG = os.environ.get(
+    "EASYFACT_SLOW_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "consultas_lentas.log"),
+)
+# límites superiores de cada cubeta del histograma, en ms
+CUBETAS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def _log_lentas():
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                # logging solo se importa la primera vez que hay una consulta lenta
+                import logging
+                from logging.handlers import RotatingFileHandler
+                os.makedirs(os.path.dirname(RUTA_LOG), exist_ok=True)
+                log = logging.getLogger("easyfact.consultas_lentas")
+                log.propagate = False
+                handler = RotatingFileHandler(RUTA_LOG, maxBytes=5 * 2**20, backupCount=3,
+                                              encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                log.addHandler(handler)
+                log.setLevel(logging.INFO)
+                _log = log
+    return _log
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(sql):
+    sql = " ".join(sql.split())
+    return re.sub(r"IN \((?:%s, )*%s\)", "IN (...)", sql)
+
+
+def redactar(params):
+    """Describe los parámetros sin su valor: tipo y, para textos, largo."""
+    if params is None:
+        return "-"
+    if not params:
+        return "[]"
+    if isinstance(params, dict):
+        params = params.values()
+    partes = []
+    for p in params:
+        if isinstance(p, str):
+            partes.append(f"<str:{len(p)}>")
+        elif p is None:
+            partes.append("NULL")
+        else:
+            partes.append(f"<{type(p).__name__}>")
+    return "[" + ", ".join(partes) + "]"
+
+
+class Histograma:
+    def __init__(self):
+        self.cuentas = [0] * len(CUBETAS_MS)
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def agregar(self, ms):
+        self.cuentas[bisect.bisect_left(CUBETAS_MS, ms)] += 1
+        self.n += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentil(self, q):
+        """Límite superior de la cubeta donde cae el percentil q (acotado por el máximo)."""
+        if not self.n:
+            return 0.0
+        objetivo = q * self.n
+        acumulado = 0
+        for limite, cuenta in zip(CUBETAS_MS, self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+    def resumen(self):
+        return {"n": self.n, "avg_ms": self.total_ms / self.n if self.n else 0.0,
+                "p50_ms": self.percentil(0.5), "p95_ms": self.percentil(0.95),
+                "p99_ms": self.percentil(0.99), "max_ms": self.max_ms}
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._consultas = {}     # sql normalizado -> [Histograma, filas, errores, lentas]
+            self.espera = Histograma()
+            self.errores_conexion = 0
+            self.desde = time.time()
+
+    def registrar_consulta(self, sql, params, ms, filas, error=None):
+        clave = normalizar_sql(sql)
+        with self._lock:
+            stats = self._consultas.get(clave)
+            if stats is None:
+                stats = self._consultas[clave] = [Histograma(), 0, 0, 0]
+            stats[0].agregar(ms)
+            stats[1] += max(filas, 0)
+            if error is not None:
+                stats[2] += 1
+            lenta = ms >= SLOW_QUERY_MS
+            if lenta:
+                stats[3] += 1
+        if lenta:
+            _log_lentas().info("%.1f ms filas=%d%s %s params=%s", ms, filas,
+                               f" error={error}" if error is not None else "", clave, redactar(params))
+
+    def registrar_espera(self, ms, error=False):
+        with self._lock:
+            self.espera.agregar(ms)
+            if error:
+                self.errores_conexion += 1
+
+    def snapshot(self):
+        """Copia de las estadísticas, ordenadas por tiempo total descendente."""
+        with self._lock:
+            consultas = [dict(h.resumen(), sql=sql, total_ms=h.total_ms, filas=filas,
+                              errores=errores, lentas=lentas)
+                         for sql, (h, filas, errores, lentas) in self._consultas.items()]
+            espera = dict(self.espera.resumen(), errores=self.errores_conexion)
+            desde = self.desde
+        consultas.sort(key=lambda c: c["total_ms"], reverse=True)
+        return {"desde": desde, "consultas": consultas, "espera_conexion": espera}
+
+
+_metricas = Metricas()
+
+
+def get_metricas():
+    return _metricas
+
+
+class CursorMedido:
+    """Envuelve un cursor: mide execute + fetch de cada sentencia y cuenta las filas."""
+
+    def __init__(self, cur):
+        self._cur = cur
+        self._actual = None      # [sql, params, segundos, filas]
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _terminar(self, error=None):
+        if self._actual is not None:
+            sql, params, segundos, filas = self._actual
+            self._actual = None
+            _metricas.registrar_consulta(sql, params, segundos * 1000, filas, error)
+
+    def _ejecutar(self, metodo, sql, params, muchas):
+        self._terminar()
+        t = time.perf_counter()
+        try:
+            resultado = metodo(sql, params)
+        except Exception as e:
+            _metricas.registrar_consulta(sql, None if muchas else params,
+                                         (time.perf_counter() - t) * 1000, 0, type(e).__name__)
+            raise
+        filas = self._cur.rowcount if muchas else 0
+        self._actual = [sql, None if muchas else params, time.perf_counter() - t, filas]
+        return resultado
+
+    def execute(self, sql, params=()):
+        return self._ejecutar(self._cur.execute, sql, params, False)
+
+    def executemany(self, sql, seq):
+        return self._ejecutar(self._cur.executemany, sql, seq, True)
+
+    def _traer(self, metodo, *args):
+        t = time.perf_counter()
+        rows = metodo(*args)
+        if self._actual is not None:
+            self._actual[2] += time.perf_counter() - t
+            if rows is not None:
+                self._actual[3] += len(rows) if isinstance(rows, list) else 1
+        return rows
+
+    def fetchone(self):
+        return self._traer(self._cur.fetchone)
+
+    def fetchall(self):
+        rows = self._traer(self._cur.fetchall)
+        self._terminar()
+        return rows
+
+    def fetchmany(self, size=1):
+        rows = self._traer(self._cur.fetchmany, size)
+        if not rows:
+            self._terminar()
+        return rows
+
+    def close(self):
+        self._terminar()
+        return self._cur.close()
+
+
+class ConexionMedida:
+    """Conexión cuyo cursor() devuelve cursores medidos; lo demás se delega."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conn.cursor(*args, **kwargs))
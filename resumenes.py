@@ -0,0 +1,156 @@
+"""Resúmenes de ventas (por día, cliente y producto) mantenidos al guardar cada factura.
+
+    python resumenes.py --reconstruir     # recalcula todo desde facturas/detalle_factura
+    python resumenes.py                   # muestra los indicadores
+
+acumular() corre dentro de la misma transacción que inserta las facturas, así
+que los resúmenes nunca quedan desfasados; el Dashboard lee solo estas tablas.
+"""
+import sys
+import threading
+
+from mysql.connector import Error
+
+from db import conexion, run_transaction
+from app.facturas.totales import de_centavos
+
+DDL = [
+    """CREATE TABLE IF NOT EXISTS ventas_dia (
+        fecha DATE PRIMARY KEY,
+        facturas INT NOT NULL DEFAULT 0,
+        total DECIMAL(14, 2) NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS ventas_cliente (
+        id_cliente INT PRIMARY KEY,
+        facturas INT NOT NULL DEFAULT 0,
+        total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        INDEX (total)
+    )""",
+    """CREATE TABLE IF NOT EXISTS ventas_producto (
+        id_producto INT PRIMARY KEY,
+        cantidad INT NOT NULL DEFAULT 0,
+        total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        INDEX (cantidad)
+    )""",
+]
+
+SQL_DIA = """INSERT INTO ventas_dia (fecha, facturas, total) VALUES (COALESCE(%s, CURDATE()), %s, %s)
+             ON DUPLICATE KEY UPDATE facturas = facturas + VALUES(facturas),
+                                     total = total + VALUES(total)"""
+SQL_CLIENTE = """INSERT INTO ventas_cliente (id_cliente, facturas, total) VALUES (%s, %s, %s)
+                 ON DUPLICATE KEY UPDATE facturas = facturas + VALUES(facturas),
+                                         total = total + VALUES(total)"""
+SQL_PRODUCTO = """INSERT INTO ventas_producto (id_producto, cantidad, total) VALUES (%s, %s, %s)
+                  ON DUPLICATE KEY UPDATE cantidad = cantidad + VALUES(cantidad),
+                                          total = total + VALUES(total)"""
+
+_tablas_listas = False
+_tablas_lock = threading.Lock()
+
+
+def asegurar_tablas(cur):
+    """Crea las tablas de resumen una vez por proceso.
+
+    CREATE TABLE hace commit implícito en MySQL: hay que llamarla antes de
+    cualquier cambio de la transacción.
+    """
+    global _tablas_listas
+    if _tablas_listas:
+        return
+    with _tablas_lock:
+        if not _tablas_listas:
+            for ddl in DDL:
+                cur.execute(ddl)
+            _tablas_listas = True
+
+
+def acumular(cur, facturas, fecha=None):
+    """Suma las facturas a los resúmenes; se llama con la transacción de la factura abierta.
+
+    Las filas se actualizan ordenadas por clave para que las transacciones
+    concurrentes tomen los locks en el mismo orden.
+    """
+    por_cliente, por_producto, total_dia = {}, {}, 0
+    for factura in facturas:
+        total = 0
+        for id_producto, centavos, cant in factura.detalles.filas():
+            subtotal = centavos * cant
+            total += subtotal
+            cant_prev, sub_prev = por_producto.get(id_producto, (0, 0))
+            por_producto[id_producto] = (cant_prev + cant, sub_prev + subtotal)
+        n_prev, tot_prev = por_cliente.get(factura.cliente.id_cliente, (0, 0))
+        por_cliente[factura.cliente.id_cliente] = (n_prev + 1, tot_prev + total)
+        total_dia += total
+
+    if not facturas:
+        return
+    cur.executemany(SQL_PRODUCTO, [(k, c, de_centavos(t)) for k, (c, t) in sorted(por_producto.items())])
+    cur.executemany(SQL_CLIENTE, [(k, n, de_centavos(t)) for k, (n, t) in sorted(por_cliente.items())])
+    cur.execute(SQL_DIA, (fecha, len(facturas), de_centavos(total_dia)))
+
+
+def reconstruir():
+    def rehacer(cur):
+        asegurar_tablas(cur)
+        for tabla in ("ventas_dia", "ventas_cliente", "ventas_producto"):
+            cur.execute(f"DELETE FROM {tabla}")
+        cur.execute("""INSERT INTO ventas_dia (fecha, facturas, total)
+                       SELECT fecha, COUNT(*), COALESCE(SUM(total), 0) FROM facturas GROUP BY fecha""")
+        cur.execute("""INSERT INTO ventas_cliente (id_cliente, facturas, total)
+                       SELECT id_cliente, COUNT(*), COALESCE(SUM(total), 0) FROM facturas GROUP BY id_cliente""")
+        cur.execute("""INSERT INTO ventas_producto (id_producto, cantidad, total)
+                       SELECT id_producto, SUM(cantidad), SUM(cantidad * precio)
+                       FROM detalle_factura GROUP BY id_producto""")
+    run_transaction(rehacer)
+
+
+def kpis():
+    """Indicadores del Dashboard; solo consulta las tablas de resumen."""
+    with conexion() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
+        asegurar_tablas(cur)
+        cur.execute("""SELECT COALESCE(SUM(CASE WHEN fecha = CURDATE() THEN facturas END), 0),
+                              COALESCE(SUM(CASE WHEN fecha = CURDATE() THEN total END), 0),
+                              COALESCE(SUM(total), 0)
+                       FROM ventas_dia WHERE fecha >= DATE_FORMAT(CURDATE(), '%Y-%m-01')""")
+        facturas_hoy, ventas_hoy, ventas_mes = cur.fetchone()
+        cur.execute("""SELECT c.nombre, v.total FROM ventas_cliente v
+                       JOIN clientes c ON c.id_cliente = v.id_cliente
+                       ORDER BY v.total DESC LIMIT 1""")
+        top_cliente = cur.fetchone()
+        cur.execute("""SELECT p.nombre, v.cantidad FROM ventas_producto v
+                       JOIN productos p ON p.id_producto = v.id_producto
+                       ORDER BY v.cantidad DESC LIMIT 1""")
+        top_producto = cur.fetchone()
+        cur.close()
+    return {
+        "facturas_hoy": int(facturas_hoy),
+        "ventas_hoy": ventas_hoy,
+        "ventas_mes": ventas_mes,
+        "top_cliente": top_cliente[0] if top_cliente else None,
+        "top_producto": top_producto[0] if top_producto else None,
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Resúmenes de ventas")
+    parser.add_argument("--reconstruir", action="store_true",
+                        help="recalcula los resúmenes desde las facturas")
+    args = parser.parse_args(argv)
+    try:
+        if args.reconstruir:
+            reconstruir()
+            print("Resúmenes reconstruidos")
+        for k, v in (kpis() or {}).items():
+            print(f"{k}: {v}")
+    except Error as e:
+        print("Error:", e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())